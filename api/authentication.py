@@ -1,4 +1,5 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from eateries.cache import auth_user_cache_key, get_auth_user, set_auth_user
 from eateries.models import UserProfile
 from rest_framework.exceptions import AuthenticationFailed
 
@@ -7,7 +8,11 @@ class CustomJWTAuthentication(JWTAuthentication):
     def get_user(self, validated_token):
         try:
             user_id = validated_token.get('user_id')
-            user = UserProfile.objects.get(id=user_id)
+            cache_key = auth_user_cache_key(user_id, validated_token)
+            user = get_auth_user(cache_key)
+            if user is None:
+                user = UserProfile.objects.get(id=user_id)
+                set_auth_user(cache_key, user)
             if not user.is_active:
                 raise AuthenticationFailed('User is not active')
             return user
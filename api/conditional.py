@@ -0,0 +1,98 @@
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(
+        "|".join(map(str, parts)).encode()
+    ).hexdigest())
+
+
+def conditional_response(request, build_response, etag=None,
+                         last_modified=None, cache_control=None):
+    """
+    Validatorlar mos kelsa javobni qurmasdan 304 qaytaradi, aks holda
+    ``build_response()`` natijasiga ETag/Last-Modified/Cache-Control qo'shadi.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+
+    if etag:
+        response['ETag'] = etag
+    if timestamp:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, **(cache_control or {'no_cache': True}))
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+class ConditionalListMixin:
+    """
+    Ro'yxatni serializatsiya qilmasdan, filtrlangan queryset bo'yicha bitta
+    agregat so'rov bilan ETag va Last-Modified hisoblaydi.
+
+    ``validator_fields`` — javobga ta'sir qiladigan ``updated_at`` maydonlari,
+    ``validator_counts`` — o'chirishlarni sezish uchun sanaladigan bog'lanishlar.
+    ETag'ga qatorlar id'lari (max va yig'indi) ham kiradi: o'chirish va
+    qo'shish bir vaqtda bo'lsa ham u o'zgaradi.
+    """
+    validator_fields = ('updated_at',)
+    validator_counts = ()
+    cache_control = None
+
+    def filter_queryset(self, queryset):
+        # validatorlar va ro'yxat uchun filtrlar bir marta qo'llanadi
+        if not hasattr(self, '_filtered_queryset'):
+            self._filtered_queryset = super().filter_queryset(queryset)
+        return self._filtered_queryset.all()
+
+    def get_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        aggregates = queryset.aggregate(
+            _count=Count('pk', distinct=True),
+            # bitta qator o'chirilib boshqasi qo'shilsa soni o'zgarmaydi,
+            # id'lar esa o'zgaradi
+            _pk_max=Max('pk'),
+            _pk_sum=Sum('pk'),
+            **{
+                f'_count_{field}': Count(field, distinct=True)
+                for field in self.validator_counts
+            },
+            **{
+                f'_max_{field}': Max(field)
+                for field in self.validator_fields
+            },
+        )
+        modified = [
+            value for key, value in aggregates.items()
+            if key.startswith('_max_') and value is not None
+        ]
+        last_modified = max(modified) if modified else None
+        etag = make_etag(
+            request.build_absolute_uri(),
+            *(aggregates[key] for key in sorted(aggregates))
+        )
+        return etag, last_modified
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        build_response = super().get
+        return conditional_response(
+            request,
+            lambda: build_response(request, *args, **kwargs),
+            etag=etag,
+            last_modified=last_modified,
+            cache_control=self.cache_control,
+        )
@@ -0,0 +1,76 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from eateries.models import IdempotencyKey
+
+
+def request_fingerprint(data):
+    return hashlib.sha256(json.dumps(
+        data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """
+    ``Idempotency-Key`` sarlavhasi bo'lsa, birinchi muvaffaqiyatli javob
+    ``IDEMPOTENCY_KEY_TTL`` davomida saqlanadi va takroriy so'rovga
+    ``create`` qayta ishlamasdan qaytariladi.
+
+    Kalit yozuvi yaratish bilan bitta tranzaksiyada: parallel dublikat
+    unique indeksda birinchisi tugashini kutadi, keyin saqlangan javobni
+    oladi. Xato bilan tugagan so'rov kalitni band qilmaydi.
+    """
+    idempotency_header = 'Idempotency-Key'
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {"error": f"{self.idempotency_header} is too long"},
+                status=400)
+
+        fingerprint = request_fingerprint(request.data)
+        keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+        # muddati o'tgan kalit qayta ishlatilishi mumkin
+        keys.filter(created_at__lt=timezone.now() - timedelta(
+            seconds=settings.IDEMPOTENCY_KEY_TTL)).delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        request_hash=fingerprint
+                    )
+            except IntegrityError:
+                return self.replay(keys.first(), fingerprint)
+
+            response = super().create(request, *args, **kwargs)
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response', 'updated_at'])
+        return response
+
+    def replay(self, record, fingerprint):
+        if record is None:
+            # birinchi so'rov xato bilan tugadi: mijoz qayta yuborishi mumkin
+            return Response(
+                {"error": "Request with this key is being processed"},
+                status=409)
+        if record.request_hash != fingerprint:
+            return Response(
+                {"error": f"{self.idempotency_header} was used with "
+                          "a different request"},
+                status=422)
+        response = Response(record.response, status=record.status_code)
+        response['Idempotent-Replayed'] = 'true'
+        return response
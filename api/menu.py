@@ -0,0 +1,130 @@
+from django.conf import settings
+
+from eateries.models import MenuSnapshot
+
+from .serializers import OrganizationSerializer, ProductSerializer
+
+
+def build_menu(organization, request):
+    """
+    Tashkilot menyusini (stol qismisiz) to'liq serializatsiya qiladi.
+    """
+    products = ProductSerializer.setup_eager_loading(
+        organization.products.filter(is_active=True)
+    ).order_by("category__name")
+    return {
+        "organization": OrganizationSerializer(
+            organization, context={"request": request}
+        ).data,
+        "products": ProductSerializer(
+            products, many=True, context={"request": request}
+        ).data,
+    }
+
+
+def relative_media_url(url, media_base_url):
+    if isinstance(url, str):
+        # request'siz serializatsiya qilingan URL'lar hostsiz keladi
+        for prefix in (media_base_url, settings.MEDIA_URL):
+            if url.startswith(prefix):
+                return url[len(prefix):]
+        return url
+    if isinstance(url, dict):
+        # rasm variantlari: {"160": {"webp": url}}
+        return {
+            key: relative_media_url(value, media_base_url)
+            for key, value in url.items()
+        }
+    return url
+
+
+def compact_menu(data, media_base_url):
+    """
+    To'liq menyudan ixcham variant: kategoriyalar bir marta yuboriladi,
+    mahsulotlar kategoriya id'si bo'yicha guruhlanadi (``category__name``
+    tartibida) va rasm yo'llari ``media_base_url`` ga nisbatan beriladi.
+    """
+    def relative(obj, *fields):
+        return {
+            key: relative_media_url(value, media_base_url)
+            if key in fields else value
+            for key, value in obj.items()
+        }
+
+    categories = {}
+    products = {}
+    for product in data["products"]:
+        category = product["category_detail"]
+        category_id = category["id"] if category else None
+        if category_id not in categories and category:
+            categories[category_id] = relative(
+                category, "image", "image_variants")
+        products.setdefault(str(category_id), []).append({
+            **{
+                key: value for key, value in product.items()
+                if key not in ("organization", "category_detail",
+                               "images_detail")
+            },
+            "images": [
+                relative_media_url(image["image"], media_base_url)
+                for image in product["images_detail"]
+            ],
+            # ``images`` bilan bir xil tartibda
+            "image_variants": [
+                relative_media_url(image["image_variants"], media_base_url)
+                for image in product["images_detail"]
+            ],
+            "image_placeholders": [
+                {
+                    "width": image["width"],
+                    "height": image["height"],
+                    "placeholder": image["placeholder"],
+                }
+                for image in product["images_detail"]
+            ],
+        })
+
+    return {
+        "media_base_url": media_base_url,
+        "organization": relative(
+            data["organization"],
+            "logo", "wallpaper", "logo_variants", "wallpaper_variants"),
+        # JS obyekt kalitlarini sonli tartiblaydi, tartib shu ro'yxatda
+        "categories": list(categories.values()),
+        "products": products,
+    }
+
+
+def get_menu(organization, request, compact=False):
+    """
+    Saqlangan snapshotni qaytaradi, versiya eskirgan bo'lsa qayta quradi.
+
+    Rasm URL'lari absolyut bo'lgani uchun snapshot har bir host uchun
+    alohida saqlanadi.
+    """
+    base_url = request.build_absolute_uri("/")
+    field = "compact_data" if compact else "data"
+    snapshot = MenuSnapshot.objects.filter(
+        organization=organization,
+        base_url=base_url
+    ).only("version", field).first()
+    # compact_data qo'shilishidan oldingi snapshotlarda u bo'sh
+    if (snapshot and snapshot.version == organization.menu_version
+            and getattr(snapshot, field)):
+        return getattr(snapshot, field)
+
+    # Versiya qurishdan oldin o'qilgan: qurish paytida menyu o'zgarsa,
+    # keyingi so'rov snapshotni yana yangilaydi.
+    data = build_menu(organization, request)
+    compact_data = compact_menu(
+        data, request.build_absolute_uri(settings.MEDIA_URL))
+    MenuSnapshot.objects.update_or_create(
+        organization=organization,
+        base_url=base_url,
+        defaults={
+            "version": organization.menu_version,
+            "data": data,
+            "compact_data": compact_data,
+        }
+    )
+    return compact_data if compact else data
@@ -0,0 +1,10 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class CompactMenuRenderer(JSONRenderer):
+    """
+    Ixcham menyu formati: ``?format=compact`` yoki
+    ``Accept: application/vnd.foodlist.menu.compact+json``.
+    """
+    media_type = 'application/vnd.foodlist.menu.compact+json'
+    format = 'compact'
@@ -0,0 +1,91 @@
+import re
+
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from rest_framework import filters
+
+from eateries.models import Product
+from eateries.search import product_search_indexes
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` natijalarini moslik bo'yicha tartiblaydi.
+
+    PostgreSQL'da full-text (GIN indeks) va trigram o'xshashlik ishlatiladi.
+    Boshqa bazalarda mahsulotlar tashkilotning xotiradagi inverted indeksidan
+    qidiriladi (``?organization=`` kerak), qolgan hollarda DRF ``icontains``.
+    ``?autocomplete=1`` — so'zlar boshlanishi bo'yicha qidirish.
+    """
+    autocomplete_param = 'autocomplete'
+
+    def is_autocomplete(self, request):
+        return request.query_params.get(
+            self.autocomplete_param, '').lower() in ('1', 'true')
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        prefix = self.is_autocomplete(request)
+        if connection.vendor == 'postgresql':
+            return self.filter_postgresql(
+                queryset, search_fields, search_terms, prefix)
+
+        organization_id = request.query_params.get('organization')
+        if queryset.model is Product and str(organization_id).isdigit():
+            return self.filter_product_index(
+                queryset, int(organization_id), search_terms, prefix)
+        return super().filter_queryset(request, queryset, view)
+
+    def filter_postgresql(self, queryset, search_fields, search_terms, prefix):
+        from django.contrib.postgres.search import (
+            SearchQuery,
+            SearchRank,
+            SearchVector,
+            TrigramSimilarity,
+        )
+
+        fields = [field.lstrip('^=$@') for field in search_fields]
+        vector = SearchVector(*fields, config='simple')
+        if prefix:
+            # faqat so'z belgilari: foydalanuvchi tsquery sintaksisini yubora olmaydi
+            words = [
+                word for word in (re.sub(r'\W+', '', term)
+                                  for term in search_terms) if word
+            ]
+            if not words:
+                return queryset.none()
+            query = SearchQuery(
+                ' & '.join(f'{word}:*' for word in words),
+                search_type='raw', config='simple')
+        else:
+            query = SearchQuery(
+                ' '.join(search_terms), search_type='plain', config='simple')
+
+        # ikkala shart ham GIN indekslardan foydalanadi: @@ va % (pg_trgm)
+        text = ' '.join(search_terms)
+        return queryset.annotate(
+            search_vector=vector,
+        ).filter(
+            Q(search_vector=query) | Q(**{f'{fields[0]}__trigram_similar': text})
+        ).annotate(
+            search_rank=SearchRank(vector, query) + TrigramSimilarity(
+                fields[0], text)
+        ).order_by('-search_rank', 'id')
+
+    def filter_product_index(self, queryset, organization_id, search_terms,
+                             prefix):
+        scores = product_search_indexes.search(
+            organization_id, ' '.join(search_terms), prefix=prefix)
+        if not scores:
+            return queryset.none()
+        return queryset.filter(id__in=scores).annotate(
+            search_rank=Case(
+                *[When(id=product_id, then=Value(float(score)))
+                  for product_id, score in scores.items()],
+                output_field=FloatField(),
+            )
+        ).order_by('-search_rank', 'id')
@@ -1,6 +1,28 @@
+from decimal import Decimal
+
 from rest_framework import serializers
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import (
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    prefetch_related_objects,
+)
 from django.utils import timezone
+from eateries.cache import (
+    evict_auth_user,
+    get_auth_user,
+    set_auth_user,
+    token_check_cache_key,
+)
+from eateries.events import publish_order_event_on_commit
+from eateries.images import schedule_image_variants, set_placeholder
+from api.utils import table_qr_code_url
 from eateries.models import (
+    hash_token,
     Currency,
     WiFi,
     Organization,
@@ -11,9 +33,41 @@ from eateries.models import (
     ProductImage,
     UserProfile,
     ProductOrder,
+    TableBatchJob,
 )
 
 
+class ImageVariantsField(serializers.Field):
+    """
+    ``<image_field>_variants`` dagi fayl nomlarini URL'larga aylantiradi:
+    ``{"160": {"webp": url, "jpeg": url}}``. Rasm almashtirilib, variantlar
+    hali tayyor bo'lmasa bo'sh obyekt qaytadi.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        image = getattr(obj, self.image_field)
+        variants = getattr(obj, f'{self.image_field}_variants') or {}
+        if not image or variants.get('source') != image.name:
+            return {}
+
+        request = self.context.get('request')
+
+        def url(name):
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        return {
+            width: {fmt: url(name) for fmt, name in formats.items()}
+            for width, formats in variants['sizes'].items()
+        }
+
+
 class CurrencySerializer(serializers.ModelSerializer):
     class Meta:
         model = Currency
@@ -40,6 +94,8 @@ class OrganizationSerializer(serializers.ModelSerializer):
     currency_detail = serializers.SerializerMethodField()
     wifi_passwords = WiFiSerializerForOrganization(many=True, write_only=True)
     wifi_passwords_detail = serializers.SerializerMethodField()
+    logo_variants = ImageVariantsField('logo')
+    wallpaper_variants = ImageVariantsField('wallpaper')
 
     class Meta:
         model = Organization
@@ -66,10 +122,14 @@ class OrganizationSerializer(serializers.ModelSerializer):
             WiFi(organization=organization, **wifi)
             for wifi in wifi_data
         ])
+        # bulk_create signal yubormaydi
+        Organization.objects.filter(pk=organization.pk).bump_menu_version()
         return organization
 
 
 class CategorySerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField('image')
+
     class Meta:
         model = Category
         fields = "__all__"
@@ -77,10 +137,12 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image = serializers.ImageField()
+    image_variants = ImageVariantsField('image')
 
     class Meta:
         model = ProductImage
-        fields = ['image', ]
+        fields = ['image', 'image_variants', 'width', 'height', 'placeholder']
+        read_only_fields = ('width', 'height', 'placeholder')
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -108,35 +170,71 @@ class ProductSerializer(serializers.ModelSerializer):
         }
         read_only_fields = ('category_detail', 'images_detail')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # many=True bo'lganda child serializer bitta, kategoriyalar ko'p takrorlanadi
+        self._category_cache = {}
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Kategoriya va rasmlarni bitta JOIN va bitta qo'shimcha so'rovda yuklaydi.
+        """
+        return queryset.select_related('category').prefetch_related('images')
+
     def get_category_detail(self, obj):
         if obj.category_id is None:
             return None
-        return CategorySerializer(obj.category).data
+        if obj.category_id not in self._category_cache:
+            self._category_cache[obj.category_id] = CategorySerializer(
+                obj.category, context=self.context).data
+        return self._category_cache[obj.category_id]
 
     def get_images_detail(self, obj):
         images_qs = getattr(obj, 'images', None)
         if images_qs is None:
             return []
-        return ProductImageSerializer(obj.images.all(), many=True).data
+        return ProductImageSerializer(
+            obj.images.all(), many=True, context=self.context).data
 
     def create(self, validated_data):
         images_data = validated_data.pop('images', [])
         product = super().create(validated_data)
 
         if images_data:
-            ProductImage.objects.bulk_create([
+            images = [
                 ProductImage(product=product, image=image_data['image'])
                 for image_data in images_data
-            ])
+            ]
+            # bulk_create pre_save signal yubormaydi
+            for image in images:
+                set_placeholder(image)
+            images = ProductImage.objects.bulk_create(images)
+            # bulk_create signal yubormaydi
+            Organization.objects.filter(
+                pk=product.organization_id
+            ).bump_menu_version()
+            for image in images:
+                schedule_image_variants(image)
 
         return product
 
 
 class TableSerializer(serializers.ModelSerializer):
+    # QR_CODE_FILES=False bo'lsa fayl yo'q: QR endpoint URL'i qaytadi
+    qr_code = serializers.SerializerMethodField()
+
     class Meta:
         model = Table
         fields = "__all__"
-        read_only_fields = ["qr_code"]
+
+    def get_qr_code(self, obj):
+        request = self.context.get('request')
+        if obj.qr_code:
+            return table_qr_code_url(
+                request, None, obj.number, obj.qr_code.name)
+        return table_qr_code_url(
+            request, obj.organization.short_name, obj.number)
 
 
 class TableCreateCollectionSerializer(serializers.Serializer):
@@ -144,13 +242,55 @@ class TableCreateCollectionSerializer(serializers.Serializer):
     table_count = serializers.IntegerField(min_value=1, required=True)
 
 
+class TableBatchJobSerializer(serializers.ModelSerializer):
+    tables = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TableBatchJob
+        fields = (
+            'id',
+            'organization',
+            'table_count',
+            'status',
+            'error',
+            'tables',
+            'created_at',
+            'updated_at',
+        )
+
+    def get_tables(self, obj):
+        request = self.context.get('request')
+        return [
+            {
+                **table,
+                "qr_code": table_qr_code_url(
+                    request, obj.organization.short_name,
+                    table['number'], table['qr_code'])
+            }
+            for table in obj.result
+        ]
+
+
+def product_orders_prefetch():
+    # /api/v1 qatorlari uchun: mahsulot kategoriya bilan, rasmlar alohida
+    return Prefetch(
+        'product_orders',
+        queryset=ProductOrder.objects.select_related(
+            'product__category').prefetch_related('product__images'),
+    )
+
+
 class ProductOrderSerializer(serializers.ModelSerializer):
-    product_name = serializers.CharField(source='product.name', read_only=True)
+    """
+    /api/v1 buyurtma qatori: avvalgi javob shakli. Nom va narx buyurtma
+    paytidagi snapshotdan, ``category`` va ``images`` mahsulotdan
+    (``OrderReadSerializer.setup_eager_loading`` oldindan yuklaydi).
+    """
     category = CategorySerializer(source='product.category', read_only=True)
     images = ProductImageSerializer(
         source='product.images', many=True, read_only=True)
     price = serializers.DecimalField(
-        source='product.price', max_digits=10, decimal_places=2, read_only=True)
+        source='unit_price', max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = ProductOrder
@@ -158,10 +298,37 @@ class ProductOrderSerializer(serializers.ModelSerializer):
                   'category', 'images', 'price', 'quantity']
 
 
+class ProductOrderSnapshotSerializer(serializers.ModelSerializer):
+    """
+    /api/v2 buyurtma qatori: faqat snapshot, mahsulot jadvali o'qilmaydi.
+    """
+    thumbnail = serializers.SerializerMethodField()
+    price = serializers.DecimalField(
+        source='unit_price', max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = ProductOrder
+        fields = ['product', 'product_name', 'category_name',
+                  'thumbnail', 'price', 'quantity']
+
+    def get_thumbnail(self, obj):
+        if not obj.thumbnail:
+            return None
+        url = default_storage.url(obj.thumbnail)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class ProductOrderWriteSerializer(serializers.Serializer):
+    # Mahsulotlar validate() da bitta so'rov bilan tekshiriladi
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     table_number = serializers.IntegerField(write_only=True)
     table = TableSerializer(read_only=True)
-    product_orders = ProductOrderSerializer(many=True, write_only=True)
+    product_orders = ProductOrderWriteSerializer(many=True, write_only=True)
     full_product_orders = ProductOrderSerializer(
         many=True, read_only=True, source='product_orders')
     phone_number = serializers.CharField(
@@ -184,19 +351,7 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             'product_orders',
             'full_product_orders',
         )
-
-    # def validate_product_orders(self, value):
-    #     try:
-    #         ids = [int(i.strip())
-    #                for i in value.split(',') if i.strip().isdigit()]
-    #         products = Product.objects.filter(id__in=ids)
-    #         if not products.exists():
-    #             raise serializers.ValidationError(
-    #                 "Hech qanday mahsulot topilmadi.")
-    #         return products
-    #     except Exception:
-    #         raise serializers.ValidationError(
-    #             "Mahsulotlar ro‘yxatini noto‘g‘ri formatda yubordingiz.")
+        read_only_fields = ('total_price',)
 
     def validate_table_number(self, value):
         organization = self.initial_data.get("organization")
@@ -210,23 +365,223 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 f"{value} raqamli stol topilmadi yoki ushbu organizationga tegishli emas.")
 
-    def create(self, validated_data):
-        table_number = validated_data.pop('table_number')
-        organization = validated_data.pop('organization')
-        table_obj = Table.objects.filter(
-            number=table_number, organization=organization).first()
-        product_orders_data = validated_data.pop('product_orders')
-        order = Order.objects.create(
-            table=table_obj,
+    def validate_product_orders(self, value):
+        if not value:
+            raise serializers.ValidationError(
+                "Kamida bitta mahsulot tanlanishi kerak.")
+
+        # Bir xil mahsulot bir necha marta kelsa, miqdorlar qo'shiladi
+        quantities = {}
+        for item in value:
+            quantities[item['product']] = (
+                quantities.get(item['product'], 0) + item['quantity']
+            )
+        return quantities
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        quantities = attrs.get('product_orders')
+        if quantities is None:
+            return attrs
+
+        organization = attrs.get(
+            'organization', getattr(self.instance, 'organization', None))
+        first_image = ProductImage.objects.filter(
+            product=OuterRef('pk')
+        ).order_by('id').values('image')[:1]
+        # qator snapshotlari uchun kerakli hamma narsa shu so'rovda
+        products = Product.objects.filter(
+            id__in=quantities,
             organization=organization,
-            **validated_data
+            is_active=True
+        ).select_related('category').only(
+            'id', 'name', 'price', 'image', 'category__name'
+        ).annotate(first_image=Subquery(first_image))
+        products = {product.id: product for product in products}
+        missing = sorted(set(quantities) - set(products))
+        if missing:
+            raise serializers.ValidationError({
+                'product_orders': (
+                    f"{', '.join(map(str, missing))} raqamli mahsulot topilmadi "
+                    "yoki ushbu organizationga tegishli emas."
+                )
+            })
+
+        attrs['product_orders'] = [
+            (products[product_id], quantity)
+            for product_id, quantity in quantities.items()
+        ]
+        attrs['total_price'] = sum(
+            (product.price * quantity
+             for product, quantity in attrs['product_orders']),
+            Decimal('0')
         )
-        for po_data in product_orders_data:
-            ProductOrder.objects.create(order=order, **po_data)
+        return attrs
 
+    def create(self, validated_data):
+        table = validated_data.pop('table_number')
+        product_orders = validated_data.pop('product_orders')
+        with transaction.atomic():
+            order = Order.objects.create(table=table, **validated_data)
+            ProductOrder.objects.bulk_create([
+                ProductOrder(
+                    order=order,
+                    product=product,
+                    quantity=quantity,
+                    product_name=product.name,
+                    unit_price=product.price,
+                    category_name=product.category.name,
+                    thumbnail=product.first_image or product.image.name or '',
+                )
+                for product, quantity in product_orders
+            ])
+
+        prefetch_related_objects([order], product_orders_prefetch())
         return order
 
 
+class OrderReadSerializer(serializers.ModelSerializer):
+    """
+    Buyurtmalarni o'qish uchun: javob ``OrderCreateSerializer`` bilan bir
+    xil, ``setup_eager_loading`` bilan so'rovlar soni buyurtmalar va
+    qatorlar soniga bog'liq emas.
+    """
+    table = TableSerializer(read_only=True)
+    full_product_orders = ProductOrderSerializer(
+        many=True, read_only=True, source='product_orders')
+    phone_number = serializers.CharField(
+        source='user.phone_number', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = (
+            'id',
+            'user',
+            'phone_number',
+            'created_at',
+            'updated_at',
+            'status',
+            'total_price',
+            'organization',
+            'table',
+            'type',
+            'full_product_orders',
+        )
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Buyurtma + foydalanuvchi + stol bitta JOIN; qatorlar (mahsulot va
+        kategoriya JOIN bilan) va rasmlar bittadan so'rovda.
+        """
+        return queryset.select_related(
+            'user', 'table__organization'
+        ).prefetch_related(product_orders_prefetch())
+
+
+class OrderSnapshotReadSerializer(OrderReadSerializer):
+    """
+    /api/v2: qatorlar faqat snapshotdan (``ProductOrderSnapshotSerializer``).
+    """
+    full_product_orders = ProductOrderSnapshotSerializer(
+        many=True, read_only=True, source='product_orders')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Buyurtma + foydalanuvchi + stol bitta JOIN, qatorlar bitta so'rovda.
+        """
+        return queryset.select_related(
+            'user', 'table__organization').prefetch_related('product_orders')
+
+
+class OrderStatusTransitionSerializer(serializers.Serializer):
+    order_id = serializers.IntegerField()
+    expected_status = serializers.ChoiceField(
+        choices=Order._meta.get_field('status').choices)
+    new_status = serializers.ChoiceField(
+        choices=Order._meta.get_field('status').choices)
+
+
+class OrderStatusBulkSerializer(serializers.Serializer):
+    transitions = OrderStatusTransitionSerializer(
+        many=True, allow_empty=False)
+
+    def validate_transitions(self, value):
+        if len(value) > settings.ORDER_STATUS_BULK_LIMIT:
+            raise serializers.ValidationError(
+                f"Bir so'rovda {settings.ORDER_STATUS_BULK_LIMIT} tadan "
+                "ko'p buyurtma bo'lishi mumkin emas.")
+        order_ids = [item['order_id'] for item in value]
+        if len(order_ids) != len(set(order_ids)):
+            raise serializers.ValidationError(
+                "Har bir buyurtma bir marta kelishi kerak.")
+        return value
+
+    def create(self, validated_data):
+        """
+        Har bir yangi status uchun bitta shartli UPDATE: buyurtma faqat hali
+        ``expected_status`` da bo'lsa o'zgaradi. Hodisa va ``updated`` faqat
+        shu UPDATE o'zgartirgan qatorlar uchun. Faqat foydalanuvchi
+        tashkilotlarining buyurtmalari o'zgaradi; boshqalari topilmagan kabi
+        ``conflicts`` da qaytadi.
+        """
+        transitions = validated_data['transitions']
+        user = self.context['request'].user
+
+        with transaction.atomic():
+            # PostgreSQL'da qator qulfi (Organization qulflanmaydi); SQLite'da
+            # yozuvlar baribir ketma-ket, himoya shartli UPDATE'da
+            orders = Order.objects.select_for_update(of=('self',)).filter(
+                organization__user=user
+            ).in_bulk([item['order_id'] for item in transitions])
+
+            by_status = {}
+            for item in transitions:
+                if item['order_id'] in orders:
+                    by_status.setdefault(item['new_status'], []).append(item)
+
+            now = timezone.now()
+            changed_ids = set()
+            current = {pk: order.status for pk, order in orders.items()}
+            for new_status, items in by_status.items():
+                condition = Q()
+                for item in items:
+                    condition |= Q(
+                        id=item['order_id'], status=item['expected_status'])
+                count = Order.objects.filter(condition).update(
+                    status=new_status, updated_at=now)
+                ids = [item['order_id'] for item in items]
+                if count != len(items):
+                    # parallel so'rov ulgurgan: joriy holat qayta o'qiladi,
+                    # o'zgarganlari shu UPDATE yozgan qiymatlar bo'yicha
+                    rows = Order.objects.filter(
+                        id__in=ids).values_list('id', 'status', 'updated_at')
+                    ids = []
+                    for pk, status, updated_at in rows:
+                        current[pk] = status
+                        if status == new_status and updated_at == now:
+                            ids.append(pk)
+                changed_ids.update(ids)
+
+            updated, conflicts = [], []
+            for item in transitions:
+                order = orders.get(item['order_id'])
+                if item['order_id'] in changed_ids:
+                    order.status, order.updated_at = item['new_status'], now
+                    updated.append(order.id)
+                    # update() signal yubormaydi
+                    publish_order_event_on_commit(order, "order.updated")
+                else:
+                    conflicts.append({
+                        'order_id': item['order_id'],
+                        'expected_status': item['expected_status'],
+                        'current_status': current.get(item['order_id']),
+                    })
+        return {'updated': updated, 'conflicts': conflicts}
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
@@ -304,17 +659,33 @@ class CheckTokenSerializer(serializers.Serializer):
     token = serializers.CharField(max_length=255)
 
     def validate_token(self, value):
-        try:
-            user = UserProfile.objects.get(auth_token=value)
-        except UserProfile.DoesNotExist:
-            raise serializers.ValidationError(
-                "Token noto'g'ri yoki mavjud emas.")
-
-        if user.token_expiry < timezone.now():
-            user.is_active = False
-            user.save()
+        token_digest = hash_token(value)
+        cache_key = token_check_cache_key(token_digest)
+        user = get_auth_user(cache_key)
+        if user is None:
+            try:
+                user = UserProfile.objects.get(auth_token_digest=token_digest)
+            except UserProfile.DoesNotExist:
+                raise serializers.ValidationError(
+                    "Token noto'g'ri yoki mavjud emas.")
+
+        now = timezone.now()
+        if user.token_expiry is None or user.token_expiry < now:
+            # faqat shu foydalanuvchi; butun jadval deactivate_expired_tokens
+            # buyrug'i bilan tozalanadi
+            if UserProfile.objects.filter(
+                pk=user.pk, is_active=True
+            ).update(is_active=False):
+                # update() signal yubormaydi
+                evict_auth_user(user.pk)
             raise serializers.ValidationError("Token muddati o'tgan.")
 
+        # natija token muddati tugaguncha keshlanadi
+        set_auth_user(cache_key, user, min(
+            (user.token_expiry - now).total_seconds(),
+            settings.TOKEN_CHECK_CACHE_TIMEOUT
+        ))
+
         # foydalanuvchini kontekstda saqlab qolamiz
         self.context['user'] = user
         return value
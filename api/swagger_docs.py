@@ -27,6 +27,20 @@ table_create_schema = swagger_auto_schema(
                 }
             }
         ),
+        202: openapi.Response(
+            description="Too many tables for one request: a job was started, "
+                        "poll tables/create_collection/<id>/ for its result",
+            examples={
+                'application/json': {
+                    "id": "3f6c1c0e-7d0a-4f7e-9a55-0c4f1b2f9b1e",
+                    "organization": 1,
+                    "table_count": 200,
+                    "status": "pending",
+                    "error": None,
+                    "tables": [],
+                }
+            }
+        ),
         400: openapi.Response(description="Invalid data"),
         404: openapi.Response(description="Organization not found"),
     }
@@ -0,0 +1,1419 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from io import BytesIO, StringIO
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CustomJWTAuthentication
+from api.utils import render_table_qr, run_table_batch_job
+from bot.utils import create_jwt_token
+from eateries.models import (
+    Category,
+    Currency,
+    IdempotencyKey,
+    MenuSnapshot,
+    Order,
+    Organization,
+    Product,
+    ProductImage,
+    ProductOrder,
+    Table,
+    TableBatchJob,
+    UserProfile,
+    WiFi,
+)
+from eateries.cache import evict_auth_user
+from eateries.images import ResizedImageCache, process_image_variants
+from eateries.search import product_search_indexes
+
+
+class FoodlistTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create(
+            phone_number="+998901234567",
+            type="manager",
+            is_active=True,
+            is_authenticated=True,
+        )
+        cls.currency = Currency.objects.create(name="So'm", code="UZS")
+        cls.organization = Organization.objects.create(
+            user=cls.user,
+            name="Oqtepa",
+            short_name="oqtepa",
+            currency=cls.currency,
+            phone_number="+998901234567",
+            address="Toshkent",
+            service_fee=Decimal("10.00"),
+        )
+        cls.category = Category.objects.create(name="Ichimliklar")
+        cls.table = Table.objects.create(
+            organization=cls.organization, number="1"
+        )
+
+    def setUp(self):
+        # throttling kesh orqali ishlaydi
+        cache.clear()
+        # test bazasi qaytarilgach id va versiyalar takrorlanishi mumkin
+        product_search_indexes.clear()
+
+    def create_products(self, count, **kwargs):
+        return Product.objects.bulk_create([
+            Product(
+                organization=self.organization,
+                category=self.category,
+                name=f"Product {i}",
+                price=Decimal("1000.00"),
+                **kwargs
+            )
+            for i in range(count)
+        ])
+
+
+class MenuSnapshotTests(FoodlistTestCase):
+    url = "/data/oqtepa"
+
+    def test_snapshot_is_reused_until_menu_changes(self):
+        self.create_products(3)
+
+        response = self.client.get(self.url, {"t": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["products"]), 3)
+        snapshot = MenuSnapshot.objects.get(organization=self.organization)
+
+        # validatorlar, tashkilot, stol, snapshot
+        with self.assertNumQueries(4):
+            self.client.get(self.url, {"t": 1})
+
+        Product.objects.create(
+            organization=self.organization,
+            category=self.category,
+            name="Choy",
+            price=Decimal("5000.00"),
+        )
+        response = self.client.get(self.url, {"t": 1})
+        self.assertEqual(len(response.json()["products"]), 4)
+        snapshot.refresh_from_db()
+        self.organization.refresh_from_db()
+        self.assertEqual(snapshot.version, self.organization.menu_version)
+
+    def test_save_does_not_overwrite_concurrent_bump(self):
+        organization = Organization.objects.get(pk=self.organization.pk)
+        version = organization.menu_version
+        Organization.objects.filter(pk=organization.pk).bump_menu_version()
+        organization.name = "Oqtepa Lavash"
+        organization.save()
+        organization.refresh_from_db()
+        # parallel bump + post_save bump
+        self.assertEqual(organization.menu_version, version + 2)
+
+    def test_category_change_invalidates_snapshot(self):
+        self.create_products(1)
+        self.client.get(self.url, {"t": 1})
+
+        self.category.name = "Sharbatlar"
+        self.category.save()
+
+        response = self.client.get(self.url, {"t": 1})
+        product = response.json()["products"][0]
+        self.assertEqual(product["category_detail"]["name"], "Sharbatlar")
+
+    def test_unknown_table(self):
+        response = self.client.get(self.url, {"t": 99})
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductQueryCountTests(FoodlistTestCase):
+    def assertQueriesConstant(self, url, params=None, before_request=None):
+        """
+        Mahsulotlar soni oshganda so'rovlar soni o'zgarmasligini tekshiradi.
+        """
+        counts = []
+        for count in (2, 20):
+            self.create_products(count)
+            if before_request:
+                before_request()
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        return counts[0], response
+
+    def test_product_list(self):
+        # tashkilot filtri, ETag agregati, mahsulotlar + kategoriyalar, rasmlar
+        num_queries, response = self.assertQueriesConstant(
+            "/api/v1/products/", {"organization": self.organization.id})
+        self.assertEqual(num_queries, 4)
+        self.assertEqual(len(response.json()), 22)
+        product = response.json()[0]
+        self.assertEqual(product["category_detail"]["name"], "Ichimliklar")
+        self.assertEqual(product["images_detail"], [])
+
+    def test_product_detail(self):
+        product = self.create_products(1)[0]
+        with self.assertNumQueries(2):
+            self.client.get(f"/api/v1/products/{product.id}/")
+
+    def test_menu_rebuild(self):
+        def invalidate():
+            Organization.objects.filter(
+                pk=self.organization.pk).bump_menu_version()
+
+        # birinchi so'rov snapshotni yaratadi (INSERT), keyingilari yangilaydi
+        self.client.get("/data/oqtepa", {"t": 1})
+        self.assertQueriesConstant(
+            "/data/oqtepa", {"t": 1}, before_request=invalidate)
+
+
+class OrderQueryCountTests(FoodlistTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = self.create_products(3)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f"images/{product.id}.jpg")
+            for product in self.products
+        ])
+
+    def create_orders(self, count):
+        orders = Order.objects.bulk_create([
+            Order(
+                user=self.user,
+                organization=self.organization,
+                table=self.table,
+                total_price=Decimal("3000.00"),
+            )
+            for _ in range(count)
+        ])
+        ProductOrder.objects.bulk_create([
+            ProductOrder(
+                order=order,
+                product=product,
+                quantity=1,
+                product_name=product.name,
+                unit_price=product.price,
+                category_name=self.category.name,
+                thumbnail=f"images/{product.id}.jpg",
+            )
+            for order in orders
+            for product in self.products
+        ])
+        return orders
+
+    def count_list_queries(self, url):
+        counts = []
+        for count in (2, 20):
+            self.create_orders(count)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, {
+                    "organization": self.organization.id, "status": "waiting"})
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(response.json()), 22)
+        return counts, response.json()[0]
+
+    def test_order_list(self):
+        counts, order = self.count_list_queries("/api/v1/orders/")
+        # tashkilot filtri, buyurtmalar, qatorlar (mahsulot JOIN), rasmlar
+        self.assertEqual(counts, [4, 4])
+        self.assertEqual(order["phone_number"], self.user.phone_number)
+        self.assertEqual(order["table"]["number"], "1")
+        self.assertEqual(len(order["full_product_orders"]), 3)
+        line = order["full_product_orders"][0]
+        self.assertEqual(line["category"]["name"], "Ichimliklar")
+        self.assertEqual(len(line["images"]), 1)
+
+    def test_snapshot_order_list(self):
+        counts, order = self.count_list_queries("/api/v2/orders/")
+        # tashkilot filtri, buyurtmalar, qatorlar (snapshot)
+        self.assertEqual(counts, [3, 3])
+        self.assertEqual(len(order["full_product_orders"]), 3)
+
+    def test_order_line_shape(self):
+        order = self.create_orders(1)[0]
+        product = self.products[0]
+        line = self.client.get(
+            f"/api/v1/orders/{order.id}/").json()["full_product_orders"][0]
+        # /api/v1: avvalgi shakl
+        self.assertEqual(
+            set(line), {"product", "product_name", "category", "images",
+                        "price", "quantity"})
+        self.assertEqual(line["category"]["id"], self.category.id)
+        self.assertEqual(
+            line["images"][0]["image"],
+            f"http://testserver/media/images/{product.id}.jpg")
+
+        line = self.client.get(
+            f"/api/v2/orders/{order.id}/").json()["full_product_orders"][0]
+        self.assertEqual(line, {
+            "product": product.id,
+            "product_name": product.name,
+            "category_name": "Ichimliklar",
+            "thumbnail": f"http://testserver/media/images/{product.id}.jpg",
+            "price": "1000.00",
+            "quantity": 1,
+        })
+
+    def test_partial_search(self):
+        self.create_orders(2)
+        for term in ("oqt", "QTEP"):
+            response = self.client.get("/api/v1/orders/", {"search": term})
+            self.assertEqual(len(response.json()), 2)
+        response = self.client.get("/api/v1/orders/", {"search": "evos"})
+        self.assertEqual(response.json(), [])
+
+    def test_order_detail(self):
+        order = self.create_orders(1)[0]
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/v1/orders/{order.id}/")
+        self.assertEqual(len(response.json()["full_product_orders"]), 3)
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/v2/orders/{order.id}/")
+        self.assertEqual(len(response.json()["full_product_orders"]), 3)
+
+
+class OrderCreateTests(FoodlistTestCase):
+    url = "/api/v1/orders/create/"
+
+    def setUp(self):
+        super().setUp()
+        self.products = self.create_products(3)
+
+    def post_order(self, product_orders, **extra):
+        data = {
+            "user": self.user.id,
+            "organization": self.organization.id,
+            "table_number": 1,
+            "type": "on_table",
+            "product_orders": product_orders,
+            **extra,
+        }
+        return self.client.post(
+            self.url, data, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {create_jwt_token(self.user)}",
+        )
+
+    def test_total_is_computed_on_server(self):
+        response = self.post_order([
+            {"product": self.products[0].id, "quantity": 2},
+            {"product": self.products[1].id, "quantity": 1},
+            {"product": self.products[0].id, "quantity": 1},
+        ], total_price="1.00")
+        self.assertEqual(response.status_code, 201, response.content)
+        order = Order.objects.get()
+        self.assertEqual(order.total_price, Decimal("4000.00"))
+        self.assertEqual(order.table, self.table)
+        self.assertEqual(
+            dict(order.product_orders.values_list("product_id", "quantity")),
+            {self.products[0].id: 3, self.products[1].id: 1},
+        )
+
+    def test_lines_are_written_in_bulk(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post_order([
+                {"product": product.id, "quantity": 1}
+                for product in self.products
+            ])
+        self.assertEqual(response.status_code, 201, response.content)
+        inserts = [
+            query["sql"] for query in ctx.captured_queries
+            if query["sql"].startswith("INSERT")
+        ]
+        self.assertEqual(len(inserts), 2)
+
+    def test_lines_keep_snapshot_after_menu_edit(self):
+        product = self.products[0]
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image="images/first.jpg"),
+            ProductImage(product=product, image="images/second.jpg"),
+        ])
+        response = self.post_order([{"product": product.id, "quantity": 2}])
+        order_id = response.json()["id"]
+
+        product.name = "Yangi nom"
+        product.price = Decimal("9999.00")
+        product.save()
+
+        line = self.client.get(
+            f"/api/v2/orders/{order_id}/").json()["full_product_orders"][0]
+        self.assertEqual(line["product_name"], "Product 0")
+        self.assertEqual(line["price"], "1000.00")
+        self.assertEqual(line["category_name"], "Ichimliklar")
+        self.assertEqual(
+            line["thumbnail"], "http://testserver/media/images/first.jpg")
+
+    def test_foreign_product_is_rejected(self):
+        other = Organization.objects.create(
+            user=self.user,
+            name="Evos",
+            short_name="evos",
+            currency=self.currency,
+            phone_number="+998901234568",
+            address="Toshkent",
+            service_fee=Decimal("0"),
+        )
+        foreign = Product.objects.create(
+            organization=other,
+            category=self.category,
+            name="Lavash",
+            price=Decimal("25000.00"),
+        )
+        response = self.post_order([{"product": foreign.id, "quantity": 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("product_orders", response.json())
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderIdempotencyTests(FoodlistTestCase):
+    url = "/api/v1/orders/create/"
+
+    def setUp(self):
+        super().setUp()
+        self.products = self.create_products(3)
+
+    def post_order(self, product_orders, key="retry-1", **extra):
+        data = {
+            "user": self.user.id,
+            "organization": self.organization.id,
+            "table_number": 1,
+            "type": "on_table",
+            "product_orders": product_orders,
+            **extra,
+        }
+        return self.client.post(
+            self.url, data, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {create_jwt_token(self.user)}",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_returns_first_response(self):
+        lines = [{"product": self.products[0].id, "quantity": 1}]
+        first = self.post_order(lines)
+        self.assertEqual(first.status_code, 201)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.post_order(lines)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertFalse(any(
+            query["sql"].startswith("INSERT INTO \"eateries_order\"")
+            for query in ctx.captured_queries))
+
+        self.assertEqual(self.post_order(lines, key="retry-2").status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_with_different_body(self):
+        self.post_order([{"product": self.products[0].id, "quantity": 1}])
+        response = self.post_order(
+            [{"product": self.products[0].id, "quantity": 5}])
+        self.assertEqual(response.status_code, 422)
+
+    def test_failed_request_does_not_hold_key(self):
+        lines = [{"product": self.products[0].id, "quantity": 1}]
+        self.assertEqual(
+            self.post_order(lines, table_number=99).status_code, 400)
+        self.assertEqual(self.post_order(lines).status_code, 201)
+
+    def test_expired_key_is_reused(self):
+        lines = [{"product": self.products[0].id, "quantity": 1}]
+        self.post_order(lines)
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(days=2))
+        self.assertNotIn("Idempotent-Replayed", self.post_order(lines))
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class OrderStatusBulkTests(FoodlistTestCase):
+    url = "/api/v1/orders/status/"
+
+    def setUp(self):
+        super().setUp()
+        self.orders = Order.objects.bulk_create([
+            Order(
+                user=self.user,
+                organization=self.organization,
+                table=self.table,
+                total_price=Decimal("0"),
+            )
+            for _ in range(4)
+        ])
+
+    def post(self, transitions):
+        return self.client.post(
+            self.url, {"transitions": transitions},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {create_jwt_token(self.user)}",
+        )
+
+    def test_transitions_and_conflicts(self):
+        first, second, third, fourth = self.orders
+        Order.objects.filter(id=third.id).update(status="ready")
+        transitions = [
+            {"order_id": first.id, "expected_status": "waiting",
+             "new_status": "ready"},
+            {"order_id": second.id, "expected_status": "waiting",
+             "new_status": "ready"},
+            {"order_id": third.id, "expected_status": "waiting",
+             "new_status": "delivered"},
+            {"order_id": fourth.id, "expected_status": "waiting",
+             "new_status": "delivered"},
+            {"order_id": 0, "expected_status": "ready",
+             "new_status": "delivered"},
+        ]
+        with self.captureOnCommitCallbacks() as callbacks, \
+                CaptureQueriesContext(connection) as ctx:
+            response = self.post(transitions)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["updated"], [first.id, second.id, fourth.id])
+        self.assertEqual(response.json()["conflicts"], [
+            {"order_id": third.id, "expected_status": "waiting",
+             "current_status": "ready"},
+            {"order_id": 0, "expected_status": "ready",
+             "current_status": None},
+        ])
+        # har bir yangi status uchun bitta UPDATE
+        updates = [query for query in ctx.captured_queries
+                   if query["sql"].startswith('UPDATE "eateries_order"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(len(callbacks), 3)
+        self.assertEqual(
+            dict(Order.objects.values_list("id", "status")), {
+                first.id: "ready", second.id: "ready",
+                third.id: "ready", fourth.id: "delivered",
+            })
+
+    def test_concurrent_change_is_not_reported_as_updated(self):
+        first, second = self.orders[:2]
+        in_bulk = QuerySet.in_bulk
+
+        def race(queryset, *args, **kwargs):
+            # boshqa so'rov o'qishdan keyin, UPDATE'dan oldin yozgan
+            orders = in_bulk(queryset, *args, **kwargs)
+            Order.objects.filter(id=first.id).update(status="delivered")
+            return orders
+
+        with mock.patch.object(QuerySet, "in_bulk", race), \
+                self.captureOnCommitCallbacks() as callbacks:
+            response = self.post([
+                {"order_id": first.id, "expected_status": "waiting",
+                 "new_status": "ready"},
+                {"order_id": second.id, "expected_status": "waiting",
+                 "new_status": "ready"},
+            ])
+        self.assertEqual(response.json()["updated"], [second.id])
+        self.assertEqual(response.json()["conflicts"], [
+            {"order_id": first.id, "expected_status": "waiting",
+             "current_status": "delivered"},
+        ])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            Order.objects.get(id=first.id).status, "delivered")
+
+    def test_only_own_organization_orders_change(self):
+        other_user = UserProfile.objects.create(
+            phone_number="+998901234569", type="manager", is_active=True)
+        other = Organization.objects.create(
+            user=other_user, name="Evos", short_name="evos",
+            currency=self.currency, phone_number="+998901234569",
+            address="Toshkent", service_fee=Decimal("0"))
+        Order.objects.filter(id=self.orders[0].id).update(organization=other)
+        response = self.post([
+            {"order_id": self.orders[0].id, "expected_status": "waiting",
+             "new_status": "ready"},
+        ])
+        self.assertEqual(response.json()["updated"], [])
+        # boshqa tashkilot buyurtmasi topilmagan kabi ko'rinadi
+        self.assertIsNone(response.json()["conflicts"][0]["current_status"])
+        self.assertEqual(Order.objects.get(id=self.orders[0].id).status,
+                         "waiting")
+
+    def test_customers_are_forbidden(self):
+        UserProfile.objects.filter(id=self.user.id).update(type="customer")
+        response = self.post([
+            {"order_id": self.orders[0].id, "expected_status": "waiting",
+             "new_status": "ready"},
+        ])
+        self.assertEqual(response.status_code, 403)
+
+    def test_duplicate_order_is_rejected(self):
+        transition = {"order_id": self.orders[0].id,
+                      "expected_status": "waiting", "new_status": "ready"}
+        response = self.post([transition, transition])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            Order.objects.filter(status="waiting").count(), 4)
+
+
+class KitchenQueueTests(FoodlistTestCase):
+    def test_waiting_quantities_by_category(self):
+        tea, coffee = self.create_products(2)
+        food = Category.objects.create(name="Taomlar")
+        plov = Product.objects.create(
+            organization=self.organization, category=food, name="Osh",
+            price=Decimal("30000"))
+        orders = Order.objects.bulk_create([
+            Order(user=self.user, organization=self.organization,
+                  table=self.table, total_price=Decimal("0"), status=status)
+            for status in ("waiting", "waiting", "ready")
+        ])
+        ProductOrder.objects.bulk_create([
+            ProductOrder(order=order, product=product, quantity=quantity,
+                         product_name=product.name,
+                         category_name=product.category.name)
+            for order, product, quantity in [
+                (orders[0], tea, 2), (orders[0], plov, 1),
+                (orders[1], tea, 3), (orders[1], coffee, 1),
+                (orders[2], tea, 10),
+            ]
+        ])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f"/api/v1/orders/kitchen/{self.organization.id}/")
+        self.assertEqual(response.json()["categories"], [
+            {"name": "Ichimliklar", "products": [
+                {"product_id": tea.id, "name": tea.name,
+                 "quantity": 5, "orders": 2},
+                {"product_id": coffee.id, "name": coffee.name,
+                 "quantity": 1, "orders": 1},
+            ]},
+            {"name": "Taomlar", "products": [
+                {"product_id": plov.id, "name": "Osh",
+                 "quantity": 1, "orders": 1},
+            ]},
+        ])
+
+
+class CursorPaginationTests(FoodlistTestCase):
+    url = "/api/v1/products/"
+
+    def test_unpaginated_by_default(self):
+        self.create_products(3)
+        response = self.client.get(self.url)
+        self.assertIsInstance(response.json(), list)
+
+    def test_pages_follow_cursor(self):
+        self.create_products(5)
+        response = self.client.get(self.url, {"page_size": 2})
+        page = response.json()
+        names = [product["name"] for product in page["results"]]
+        while page["next"]:
+            page = self.client.get(page["next"]).json()
+            names += [product["name"] for product in page["results"]]
+        self.assertEqual(len(names), 5)
+        self.assertEqual(len(set(names)), 5)
+
+    def test_keyset_handles_created_at_ties(self):
+        self.create_products(7)
+        Product.objects.update(created_at=timezone.now())
+        expected = list(Product.objects.order_by(
+            "-id").values_list("name", flat=True))
+
+        pages = [self.client.get(self.url, {"page_size": 3}).json()]
+        while pages[-1]["next"]:
+            pages.append(self.client.get(pages[-1]["next"]).json())
+        names = [product["name"]
+                 for page in pages for product in page["results"]]
+        self.assertEqual(names, expected)
+
+        previous = self.client.get(pages[-1]["previous"]).json()
+        self.assertEqual(previous["results"], pages[-2]["results"])
+
+
+class OrderEventStreamTests(FoodlistTestCase):
+    def create_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Order.objects.create(
+                user=self.user,
+                organization=self.organization,
+                table=self.table,
+                total_price=Decimal("0"),
+            )
+
+    def save_order(self, order):
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+    async def read_events(self, count, last_event_id):
+        response = await self.async_client.get(
+            f"/api/v1/orders/stream/{self.organization.id}/",
+            headers={"Last-Event-ID": last_event_id})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        chunks = []
+        try:
+            while len(chunks) < count:
+                chunk = await asyncio.wait_for(anext(stream), timeout=5)
+                if chunk.startswith(b"id:"):
+                    chunks.append(chunk.decode())
+        finally:
+            await stream.aclose()
+        return chunks
+
+    async def test_resume_from_last_event_id(self):
+        first = await sync_to_async(self.create_order)()
+        second = await sync_to_async(self.create_order)()
+        second.status = "ready"
+        await sync_to_async(self.save_order)(second)
+
+        events = await self.read_events(3, "0")
+        event_types = [event.split("\n")[1] for event in events]
+        self.assertEqual(event_types, [
+            "event: order.created",
+            "event: order.created",
+            "event: order.updated",
+        ])
+        self.assertIn(f'"id": {first.id}', events[0])
+
+        last_id = events[1].split("\n")[0].split(": ")[1]
+        events = await self.read_events(1, last_id)
+        self.assertIn('"status": "ready"', events[0])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), TABLE_BATCH_SYNC_LIMIT=3)
+class TableCreateCollectionTests(FoodlistTestCase):
+    url = "/api/v1/tables/create_collection/"
+
+    def post(self, table_count):
+        return self.client.post(
+            self.url,
+            {"organization_id": self.organization.id,
+             "table_count": table_count},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {create_jwt_token(self.user)}",
+        )
+
+    def test_small_batch_is_created_inline(self):
+        response = self.post(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [table["number"] for table in response.json()["tables"]],
+            ["1", "2", "3"],
+        )
+        self.assertEqual(
+            Table.objects.filter(organization=self.organization).count(), 3)
+        self.assertFalse(
+            Table.objects.filter(qr_code__isnull=True).exists())
+
+    @override_settings(QR_CODE_FILES=False)
+    def test_files_are_optional(self):
+        response = self.post(2)
+        self.assertEqual(
+            response.json()["tables"][1]["qr_code"],
+            "http://testserver/api/v1/qr/oqtepa/2.png")
+        self.assertFalse(Table.objects.exclude(qr_code="").exclude(
+            qr_code__isnull=True).exists())
+        tables = self.client.get(
+            "/api/v1/tables/", {"organization": self.organization.id}).json()
+        self.assertEqual(
+            tables[1]["qr_code"], "http://testserver/api/v1/qr/oqtepa/2.png")
+
+    def test_large_batch_returns_job(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.post(5)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["id"]
+
+        # threadsiz ishga tushiramiz: test tranzaksiyasini ko'rishi uchun
+        with mock.patch("api.utils.connection"):
+            run_table_batch_job(job_id)
+        self.assertEqual(len(callbacks), 1)
+
+        response = self.client.get(f"{self.url}{job_id}/")
+        self.assertEqual(response.json()["status"], "done")
+        self.assertEqual(len(response.json()["tables"]), 5)
+
+    def test_stale_job_is_reported_as_failed(self):
+        with self.captureOnCommitCallbacks():
+            job_id = self.post(5).json()["id"]
+        # thread deploy paytida o'lgan
+        TableBatchJob.objects.filter(pk=job_id).update(
+            status="running", updated_at=timezone.now() - timedelta(hours=1))
+        response = self.client.get(f"{self.url}{job_id}/")
+        self.assertEqual(response.json()["status"], "failed")
+
+    def test_existing_numbers_are_not_duplicated(self):
+        self.post(3)
+        self.post(3)
+        self.assertEqual(
+            Table.objects.filter(organization=self.organization).count(), 3)
+
+
+class AuthenticationCacheTests(FoodlistTestCase):
+    def authenticate(self):
+        request = RequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        return CustomJWTAuthentication().authenticate(request)
+
+    def setUp(self):
+        super().setUp()
+        self.token = create_jwt_token(self.user)
+
+    def test_user_is_cached_per_token(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual(user, self.user)
+
+    def test_deactivation_evicts_cached_user(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_eviction_covers_every_cached_token(self):
+        tokens = [self.token, create_jwt_token(self.user)]
+        for token in tokens:
+            self.token = token
+            self.authenticate()
+        evict_auth_user(self.user.id)
+        for token in tokens:
+            self.token = token
+            with self.assertNumQueries(1):
+                self.authenticate()
+
+
+class CheckTokenTests(FoodlistTestCase):
+    url = "/api/v1/users/check_token/"
+
+    def setUp(self):
+        super().setUp()
+        self.user.auth_token = create_jwt_token(self.user)
+        self.user.set_token_expiry(hours=1)
+        self.user.save()
+
+    def check(self, token):
+        return self.client.post(
+            self.url, {"token": token}, content_type="application/json")
+
+    def test_valid_token_is_cached(self):
+        response = self.check(self.user.auth_token)
+        self.assertEqual(response.json(), {
+            "is_valid": True, "user_id": self.user.id})
+        with self.assertNumQueries(0):
+            self.check(self.user.auth_token)
+
+    def test_rotated_token_is_evicted(self):
+        old_token = self.user.auth_token
+        self.check(old_token)
+        self.user.auth_token = "new-token"
+        self.user.save()
+        self.assertEqual(self.check(old_token).status_code, 400)
+
+    def test_expired_token_deactivates_only_its_user(self):
+        other = UserProfile.objects.create(
+            phone_number="+998901234568",
+            is_active=True,
+            auth_token="other-token",
+            token_expiry=timezone.now() - timedelta(hours=1),
+        )
+        self.user.token_expiry = timezone.now() - timedelta(hours=1)
+        self.user.save()
+
+        response = self.check(self.user.auth_token)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(
+            UserProfile.objects.get(id=self.user.id).is_active)
+        # qolganlari deactivate_expired_tokens buyrug'iga qoldiriladi
+        self.assertTrue(UserProfile.objects.get(id=other.id).is_active)
+        call_command("deactivate_expired_tokens", stdout=StringIO())
+        self.assertFalse(UserProfile.objects.get(id=other.id).is_active)
+
+
+class ConditionalGetTests(FoodlistTestCase):
+    def assertRevalidates(self, url, params, change):
+        response = self.client.get(url, params)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(
+            url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_menu(self):
+        product = self.create_products(1)[0]
+
+        def deactivate():
+            product.is_active = False
+            product.save()
+
+        self.assertRevalidates("/data/oqtepa", {"t": 1}, deactivate)
+        etag = self.client.get("/data/oqtepa", {"t": 1})["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/data/oqtepa", {"t": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("max-age=30", response["Cache-Control"])
+
+    def test_product_list_notices_deleted_products(self):
+        products = self.create_products(2)
+        self.assertRevalidates(
+            "/api/v1/products/", {"organization": self.organization.id},
+            products[0].delete)
+
+    def test_product_list_notices_delete_plus_create(self):
+        products = self.create_products(2)
+        modified = timezone.now()
+        Product.objects.update(updated_at=modified)
+
+        def replace():
+            products[0].delete()
+            self.create_products(1)
+            # soni va eng so'nggi updated_at o'zgarmagan
+            Product.objects.update(updated_at=modified)
+
+        self.assertRevalidates(
+            "/api/v1/products/", {"organization": self.organization.id},
+            replace)
+
+    def test_category_list(self):
+        def rename():
+            self.category.name = "Salatlar"
+            self.category.save()
+
+        self.assertRevalidates("/api/v1/categories/", {}, rename)
+
+
+class CompactMenuTests(FoodlistTestCase):
+    def test_compact_format(self):
+        self.create_products(2)
+        desserts = Category.objects.create(name="Desertlar")
+        Product.objects.create(
+            organization=self.organization,
+            category=desserts,
+            name="Tort",
+            price=Decimal("20000.00"),
+        )
+
+        response = self.client.get("/data/oqtepa", {"t": 1, "format": "compact"})
+        data = response.json()
+        self.assertEqual(data["media_base_url"], "http://testserver/media/")
+        self.assertEqual(
+            [category["name"] for category in data["categories"]],
+            ["Desertlar", "Ichimliklar"],
+        )
+        self.assertEqual(len(data["products"][str(self.category.id)]), 2)
+        self.assertNotIn("category_detail", data["products"][str(desserts.id)][0])
+        self.assertEqual(data["table"]["number"], "1")
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_image_paths_are_relative(self):
+        self.category.image = "categories/drinks.jpg"
+        self.category.image_variants = {
+            "source": "categories/drinks.jpg",
+            "sizes": {"160": {"webp": "categories/drinks_160w.webp"}},
+        }
+        self.category.save()
+        product = self.create_products(1)[0]
+        ProductImage.objects.create(
+            product=product,
+            image="images/tea.jpg",
+            image_variants={
+                "source": "images/tea.jpg",
+                "sizes": {"160": {"webp": "images/tea_160w.webp"}},
+            },
+        )
+
+        data = self.client.get(
+            "/data/oqtepa", {"t": 1, "format": "compact"}).json()
+        category = data["categories"][0]
+        self.assertEqual(category["image"], "categories/drinks.jpg")
+        self.assertEqual(
+            category["image_variants"],
+            {"160": {"webp": "categories/drinks_160w.webp"}})
+        line = data["products"][str(self.category.id)][0]
+        self.assertEqual(line["images"], ["images/tea.jpg"])
+        self.assertEqual(
+            line["image_variants"],
+            [{"160": {"webp": "images/tea_160w.webp"}}])
+
+    def test_empty_compact_snapshot_is_rebuilt(self):
+        self.client.get("/data/oqtepa", {"t": 1})
+        MenuSnapshot.objects.update(compact_data={})
+        data = self.client.get(
+            "/data/oqtepa", {"t": 1, "format": "compact"}).json()
+        self.assertIn("categories", data)
+
+    def test_accept_header_selects_format(self):
+        response = self.client.get(
+            "/data/oqtepa", {"t": 1},
+            HTTP_ACCEPT="application/vnd.foodlist.menu.compact+json")
+        self.assertIn("categories", response.json())
+        self.assertNotEqual(
+            response["ETag"], self.client.get("/data/oqtepa", {"t": 1})["ETag"])
+
+
+class ProductSearchTests(FoodlistTestCase):
+    url = "/api/v1/products/"
+
+    def setUp(self):
+        super().setUp()
+        for name, description in (
+            ("Choy", "Ko'k choy"),
+            ("Limonli choy", ""),
+            ("Cholpon salat", "Pomidor, bodring"),
+            ("Kofe", "Qora choy emas"),
+        ):
+            Product.objects.create(
+                organization=self.organization,
+                category=self.category,
+                name=name,
+                description=description,
+                price=Decimal("5000.00"),
+            )
+
+    def search(self, text, **params):
+        response = self.client.get(self.url, {
+            "organization": self.organization.id, "search": text, **params})
+        return [product["name"] for product in response.json()]
+
+    def test_results_are_ranked(self):
+        # nomdagi moslik tavsifdagidan yuqori turadi
+        self.assertEqual(
+            self.search("choy"), ["Choy", "Limonli choy", "Kofe"])
+
+    def test_autocomplete_matches_prefixes(self):
+        self.assertEqual(self.search("cho"), [])
+        self.assertEqual(
+            self.search("cho", autocomplete=1),
+            ["Choy", "Limonli choy", "Cholpon salat", "Kofe"])
+
+    def test_index_follows_product_changes(self):
+        self.assertEqual(self.search("kofe"), ["Kofe"])
+        product = Product.objects.get(name="Kofe")
+        product.name = "Kakao"
+        product.save()
+        self.assertEqual(self.search("kofe"), [])
+        self.assertEqual(self.search("kakao"), ["Kakao"])
+
+        product.delete()
+        self.assertEqual(self.search("kakao"), [])
+
+    def test_index_is_updated_in_place_on_commit(self):
+        self.search("kofe")
+        index = product_search_indexes._indexes[self.organization.id]
+        product = Product.objects.get(name="Kofe")
+        product.name = "Kakao"
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.save()
+        # commitgacha indeks o'zgarmaydi
+        self.assertIn("kofe", index.postings)
+        for callback in callbacks:
+            callback()
+        self.assertIs(
+            product_search_indexes._indexes[self.organization.id], index)
+        self.assertEqual(self.search("kakao"), ["Kakao"])
+
+    def test_index_is_dropped_when_versions_were_skipped(self):
+        self.search("kofe")
+        # boshqa jarayondagi o'zgarish
+        Organization.objects.filter(
+            pk=self.organization.pk).bump_menu_version()
+        product = Product.objects.get(name="Kofe")
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertNotIn(self.organization.id, product_search_indexes._indexes)
+
+
+def image_file(name="photo.jpg", size=(1200, 800), fmt="JPEG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, "orange").save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageVariantTests(FoodlistTestCase):
+    def create_image(self):
+        product = self.create_products(1)[0]
+        with self.captureOnCommitCallbacks() as callbacks:
+            image = ProductImage.objects.create(
+                product=product, image=image_file())
+        self.assertEqual(len(callbacks), 1)
+        return image
+
+    def run_worker(self, image):
+        # threadsiz: test tranzaksiyasini ko'rishi uchun
+        with mock.patch("eateries.images.connection"):
+            process_image_variants(
+                ProductImage, image.pk, "image", image.image.name)
+        image.refresh_from_db()
+
+    def test_variants_are_generated(self):
+        image = self.create_image()
+        self.run_worker(image)
+
+        sizes = image.image_variants["sizes"]
+        self.assertEqual(set(sizes), {"160", "640"})
+        for width, formats in sizes.items():
+            self.assertEqual(set(formats), {"webp", "jpeg"})
+            with default_storage.open(formats["webp"]) as file:
+                self.assertEqual(Image.open(file).size[0], int(width))
+
+        # variantlar yozilgani signal yubormaydi, callback qaytmaydi
+        with self.captureOnCommitCallbacks() as callbacks:
+            image.save()
+        self.assertEqual(callbacks, [])
+
+    def test_decompression_bomb_is_skipped(self):
+        # 1200x800 rasm 2 * MAX_IMAGE_PIXELS dan katta: DecompressionBombError
+        with mock.patch("PIL.Image.MAX_IMAGE_PIXELS", 1000), \
+                self.assertLogs("eateries.images", "WARNING") as logs:
+            image = self.create_image()
+            self.assertEqual(image.placeholder, "")
+            self.run_worker(image)
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(image.image_variants, {})
+
+    def test_menu_exposes_variant_urls(self):
+        image = self.create_image()
+        response = self.client.get("/data/oqtepa", {"t": 1})
+        product = response.json()["products"][0]
+        self.assertEqual(product["images_detail"][0]["image_variants"], {})
+
+        self.run_worker(image)
+        response = self.client.get("/data/oqtepa", {"t": 1})
+        variants = response.json()["products"][0]["images_detail"][0][
+            "image_variants"]
+        self.assertTrue(variants["160"]["webp"].endswith(".webp"))
+
+    def test_placeholder_and_dimensions(self):
+        image = self.create_image()
+        self.assertEqual((image.width, image.height), (1200, 800))
+        self.assertTrue(
+            image.placeholder.startswith("data:image/jpeg;base64,"))
+        self.assertLess(len(image.placeholder), 2000)
+
+        data = self.client.get(
+            "/data/oqtepa", {"t": 1, "format": "compact"}).json()
+        placeholders = data["products"][str(self.category.id)][0][
+            "image_placeholders"]
+        self.assertEqual(placeholders, [{
+            "width": 1200, "height": 800, "placeholder": image.placeholder}])
+
+    def test_backfill_placeholders(self):
+        product = self.create_products(1)[0]
+        name = default_storage.save("images/old.jpg", image_file(size=(300, 600)))
+        # bulk_create signal yubormaydi: eski rasmlar kabi
+        ProductImage.objects.bulk_create(
+            [ProductImage(product=product, image=name)])
+
+        call_command("backfill_image_placeholders", stdout=StringIO())
+        image = ProductImage.objects.get()
+        self.assertEqual((image.width, image.height), (300, 600))
+        self.assertTrue(image.placeholder)
+
+    def test_replaced_image_discards_stale_variants(self):
+        image = self.create_image()
+        old_name = image.image.name
+        image.image = image_file("new.png", fmt="PNG")
+        image.save()
+
+        with mock.patch("eateries.images.connection"):
+            process_image_variants(ProductImage, image.pk, "image", old_name)
+        image.refresh_from_db()
+        self.assertEqual(image.image_variants, {})
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_RESIZE_CACHE_DIR=tempfile.mkdtemp())
+class ResizedImageTests(FoodlistTestCase):
+    url = "/api/v1/images/"
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("eateries.images._resized_image_cache", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.name = default_storage.save("products/photo.jpg", image_file())
+
+    def test_resized_and_cacheable(self):
+        response = self.client.get(
+            f"{self.url}160/{self.name}", HTTP_ACCEPT="image/webp,*/*")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("max-age=2592000", response["Cache-Control"])
+        image = Image.open(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(image.size[0], 160)
+
+        response = self.client.get(
+            f"{self.url}160/{self.name}",
+            HTTP_IF_NONE_MATCH=response["ETag"], HTTP_ACCEPT="image/webp")
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(f"{self.url}160/{self.name}")
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+
+    def test_invalid_requests(self):
+        self.assertEqual(
+            self.client.get(f"{self.url}161/{self.name}").status_code, 400)
+        self.assertEqual(
+            self.client.get(f"{self.url}160/products/none.jpg").status_code,
+            404)
+        self.assertEqual(
+            self.client.get(f"{self.url}160/../core/settings.py").status_code,
+            404)
+
+    def test_concurrent_renders_collapse(self):
+        cache = ResizedImageCache(tempfile.mkdtemp(), 1024)
+        renders = []
+
+        def render():
+            renders.append(1)
+            time.sleep(0.05)
+            return b"data"
+
+        threads = [
+            threading.Thread(target=cache.get_or_render, args=("key", render))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(renders), 1)
+
+    def test_least_recently_used_are_evicted(self):
+        cache = ResizedImageCache(tempfile.mkdtemp(), 25)
+        first = cache.put("a" * 8, b"x" * 10)
+        os.utime(first, (1, 1))
+        second = cache.put("b" * 8, b"x" * 10)
+        os.utime(second, (2, 2))
+        # "a" o'qildi, endi eng eskisi "b"
+        cache.get("a" * 8)
+        cache.put("c" * 8, b"x" * 10)
+
+        self.assertIsNotNone(cache.get("a" * 8))
+        self.assertIsNone(cache.get("b" * 8))
+        self.assertIsNotNone(cache.get("c" * 8))
+
+    def test_evicted_file_is_rendered_again(self):
+        cache = ResizedImageCache(tempfile.mkdtemp(), 1024)
+        path = cache.put("key", b"old")
+        # boshqa so'rov fayl ochilishidan oldin uni evict qildi
+        with mock.patch.object(cache, "get_or_render", return_value=path):
+            os.remove(path)
+            with cache.open_or_render("key", lambda: b"new") as file:
+                self.assertEqual(file.read(), b"new")
+
+        with mock.patch(
+                "eateries.images.ResizedImageCache.get_or_render",
+                return_value=path):
+            response = self.client.get(f"{self.url}160/{self.name}")
+        self.assertEqual(response.status_code, 200)
+        image = Image.open(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(image.size[0], 160)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class MediaServingTests(FoodlistTestCase):
+    def setUp(self):
+        super().setUp()
+        # xeshsiz nom: eski fayllar kabi
+        self.name = FileSystemStorage().save(
+            "qr_codes/qr.png", SimpleUploadedFile("qr.png", bytes(range(200))))
+        self.url = f"/media/{self.name}"
+
+    def test_full_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(200)))
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/200")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(195, 200)))
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=500-")
+        self.assertEqual(response.status_code, 416)
+
+        # fayl o'zgargan: If-Range mos kelmasa to'liq fayl
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_hashed_names_are_immutable(self):
+        name = default_storage.save(
+            "products/0123456789abcdef0123.jpg", SimpleUploadedFile("x", b"x"))
+        response = self.client.get(f"/media/{name}")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.client.get("/media/none.png").status_code, 404)
+        self.assertEqual(
+            self.client.get("/media/../core/settings.py").status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect")
+    def test_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(response.content, b"")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTests(FoodlistTestCase):
+    def test_identical_uploads_share_a_file(self):
+        first = default_storage.save("products/a.JPG", image_file())
+        second = default_storage.save("images/b.jpg", image_file())
+        self.assertEqual(first, second)
+        self.assertRegex(first, r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertNotEqual(
+            default_storage.save("images/c.jpg", image_file(size=(10, 10))),
+            first)
+
+    def test_migrate_media_rewrites_paths(self):
+        storage = FileSystemStorage()
+        photo = image_file()
+        old_names = [
+            storage.save(f"images/photo_{i}.jpg", photo) for i in range(3)
+        ]
+        products = self.create_products(3)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=name)
+            for product, name in zip(products, old_names)
+        ])
+        ProductImage.objects.filter(image=old_names[0]).update(
+            image_variants={"source": old_names[0], "sizes": {}})
+        WiFi.objects.create(
+            organization=self.organization, name="Oqtepa", password="1234",
+            qr_code=storage.save("qr_codes/wifi.png", image_file(fmt="PNG")))
+        order = Order.objects.create(
+            user=self.user, organization=self.organization,
+            table=self.table, total_price=Decimal("0"))
+        ProductOrder.objects.create(
+            order=order, product=products[0], quantity=1,
+            thumbnail=old_names[1])
+        job = TableBatchJob.objects.create(
+            organization=self.organization, table_count=1, status="done",
+            result=[{"id": self.table.id, "number": "1",
+                     "qr_code": old_names[2]}])
+        version = self.organization.menu_version
+
+        call_command(
+            "migrate_media_to_cas", "--delete-originals", stdout=StringIO())
+
+        names = set(ProductImage.objects.values_list("image", flat=True))
+        self.assertEqual(len(names), 1)
+        new_name = names.pop()
+        self.assertTrue(default_storage.exists(new_name))
+        self.assertFalse(any(storage.exists(name) for name in old_names))
+        self.assertEqual(
+            ProductImage.objects.get(image_variants__sizes={}).image_variants[
+                "source"],
+            new_name)
+        self.assertTrue(WiFi.objects.get().qr_code.name.endswith(".png"))
+        # storage yo'li saqlanadigan CharField va JSON maydonlar
+        self.assertEqual(ProductOrder.objects.get().thumbnail, new_name)
+        job.refresh_from_db()
+        self.assertEqual(job.result[0]["qr_code"], new_name)
+        self.organization.refresh_from_db()
+        self.assertGreater(self.organization.menu_version, version)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), QR_CODE_WORKERS=2)
+class TableQRCodeExportTests(FoodlistTestCase):
+    def test_zip_contains_labeled_codes(self):
+        Table.objects.bulk_create([
+            Table(organization=self.organization, number=str(number))
+            for number in range(2, 12)
+        ])
+        # bitta stolning QR fayli bor, qolganlari eksport paytida chiziladi
+        self.table.qr_code = default_storage.save(
+            "qr_codes/qr.png", image_file(size=(100, 100), fmt="PNG"))
+        self.table.save()
+
+        response = self.client.get(
+            f"/api/v1/tables/qr_codes/{self.organization.id}/",
+            HTTP_AUTHORIZATION=f"Bearer {create_jwt_token(self.user)}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("qr_oqtepa.zip", response["Content-Disposition"])
+
+        archive = zipfile.ZipFile(
+            BytesIO(b"".join(response.streaming_content)))
+        names = archive.namelist()
+        self.assertEqual(names[:3], ["oqtepa_1.png", "oqtepa_2.png", "oqtepa_3.png"])
+        self.assertEqual(len(names), 11)
+        first = Image.open(BytesIO(archive.read("oqtepa_1.png")))
+        # QR ostida raqam uchun joy
+        self.assertEqual(first.width, 100)
+        self.assertGreater(first.height, 100)
+
+    def test_requires_authentication(self):
+        response = self.client.get(
+            f"/api/v1/tables/qr_codes/{self.organization.id}/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_other_users_organization_is_forbidden(self):
+        other_user = UserProfile.objects.create(
+            phone_number="+998901234569", type="manager", is_active=True)
+        response = self.client.get(
+            f"/api/v1/tables/qr_codes/{self.organization.id}/",
+            HTTP_AUTHORIZATION=f"Bearer {create_jwt_token(other_user)}")
+        self.assertEqual(response.status_code, 403)
+
+
+class TableQRCodeTests(FoodlistTestCase):
+    url = "/api/v1/qr/oqtepa/1"
+
+    def setUp(self):
+        super().setUp()
+        render_table_qr.cache_clear()
+
+    def test_png_is_rendered_and_cached(self):
+        response = self.client.get(f"{self.url}.png")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("max-age=604800", response["Cache-Control"])
+        Image.open(BytesIO(response.content)).verify()
+
+        response = self.client.get(
+            f"{self.url}.png", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        self.client.get(f"{self.url}.png")
+        self.assertEqual(render_table_qr.cache_info().hits, 1)
+
+    def test_svg(self):
+        response = self.client.get(f"{self.url}.svg")
+        self.assertEqual(response["Content-Type"], "image/svg+xml")
+        self.assertIn(b"<svg", response.content)
+
+    def test_unknown_table_or_format(self):
+        self.assertEqual(
+            self.client.get("/api/v1/qr/oqtepa/99.png").status_code, 404)
+        self.assertEqual(self.client.get(f"{self.url}.gif").status_code, 404)
@@ -20,12 +20,19 @@ from api.views import (
     TableUpdateAPIView,
     TableDestroyAPIView,
     TableCreateCollectionAPIView,
+    TableBatchJobAPIView,
+    TableQRCodeExportAPIView,
+    TableQRCodeView,
     OrderCreateAPIView,
     OrderListAPIView,
     OrderDetailAPIView,
     OrderDestroyAPIView,
     OrderUpdateAPIView,
+    OrderEventStreamView,
+    KitchenQueueAPIView,
+    OrderStatusBulkAPIView,
     OrganizationCategoryListAPIView,
+    ResizedImageView,
     UserCreateAPIView,
     UserDetailAPIView,
     PhoneCheckAPIView,
@@ -111,6 +118,19 @@ urlpatterns = [
         "tables/create_collection/",
         TableCreateCollectionAPIView.as_view()
     ),
+    path(
+        "tables/create_collection/<uuid:pk>/",
+        TableBatchJobAPIView.as_view()
+    ),
+    path(
+        "tables/qr_codes/<int:organization_id>/",
+        TableQRCodeExportAPIView.as_view()
+    ),
+    path(
+        "qr/<str:short_name>/<str:number>.<str:fmt>",
+        TableQRCodeView.as_view(),
+        name="table-qr-code"
+    ),
     path(
         "tables/",
         TableListAPIView.as_view()
@@ -149,6 +169,24 @@ urlpatterns = [
         "orders/delete/<int:pk>/",
         OrderDestroyAPIView.as_view()
     ),
+    path(
+        "orders/status/",
+        OrderStatusBulkAPIView.as_view()
+    ),
+    path(
+        "orders/kitchen/<int:organization_id>/",
+        KitchenQueueAPIView.as_view()
+    ),
+    path(
+        "orders/stream/<int:organization_id>/",
+        OrderEventStreamView.as_view()
+    ),
+
+    # Image
+    path(
+        "images/<int:width>/<path:path>",
+        ResizedImageView.as_view()
+    ),
 
     # User
     path(
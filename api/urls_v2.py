@@ -0,0 +1,18 @@
+from django.urls import path
+from api.views import (
+    OrderSnapshotListAPIView,
+    OrderSnapshotDetailAPIView,
+)
+
+# /api/v2: javob shakli /api/v1 dan farq qiladigan endpointlar
+urlpatterns = [
+    # Order
+    path(
+        "orders/",
+        OrderSnapshotListAPIView.as_view()
+    ),
+    path(
+        "orders/<int:pk>/",
+        OrderSnapshotDetailAPIView.as_view()
+    ),
+]
@@ -1,35 +1,261 @@
-import os
+import threading
+import zipfile
 import qrcode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
 from io import BytesIO
+from itertools import islice
+from PIL import Image, ImageDraw, ImageFont
+from qrcode.image.svg import SvgPathImage
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
 import re
 
+from eateries.models import Table, TableBatchJob
+
 
 def safe_filename(value: str) -> str:
     return re.sub(r'\W+', '_', value)
 
 
-def create_qr_code_for_tables(organization_name: str, number: str):
+def table_qr_data(organization_name: str, number: str):
     if settings.DEBUG:
-        qr_data = f"http://localhost:8000/{organization_name}?t={number}/"
-    else:
-        qr_data = f"https://foodlistback.pythonanywhere.com/{organization_name}?t={number}/"
+        return f"http://localhost:8000/{organization_name}?t={number}/"
+    return f"https://foodlistback.pythonanywhere.com/{organization_name}?t={number}/"
 
-    qr_img = qrcode.make(qr_data)
 
+@lru_cache(maxsize=settings.QR_CODE_CACHE_SIZE)
+def render_table_qr(qr_data: str, fmt: str = 'png') -> bytes:
+    """
+    QR kodni PNG yoki SVG baytlari sifatida qaytaradi. Kesh kaliti QR
+    ichidagi URL: domen yoki sxema o'zgarsa, kod qaytadan chiziladi.
+    """
+    if fmt == 'svg':
+        qr_img = qrcode.make(qr_data, image_factory=SvgPathImage)
+    else:
+        qr_img = qrcode.make(qr_data)
     buffer = BytesIO()
-    qr_img.save(buffer, format='PNG')
-    buffer.seek(0)
+    qr_img.save(buffer)
+    return buffer.getvalue()
+
+
+def table_qr_code_url(request, short_name, number, qr_code_name=None):
+    """
+    Saqlangan QR fayl URL'i, fayl bo'lmasa QR endpoint URL'i.
+    """
+    if qr_code_name:
+        url = default_storage.url(qr_code_name)
+    else:
+        url = reverse('table-qr-code', kwargs={
+            'short_name': short_name, 'number': number, 'fmt': 'png'})
+    return request.build_absolute_uri(url) if request else url
+
+
+def create_qr_code_for_tables(organization_name: str, number: str):
+    qr_png = render_table_qr(table_qr_data(organization_name, number))
 
     filename = f"qr_{organization_name}_{number}.png"
     relative_path = f"qr_codes/{filename}"
-    full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
 
-    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    # Kontent xeshli storage fayl nomini xeshdan oladi: bir xil QR qayta
+    # yozilmaydi, mavjud nom qaytadi.
+    return default_storage.save(relative_path, ContentFile(qr_png))
+
+
+def create_tables_with_qr_codes(organization, table_count):
+    """
+    1..table_count raqamli stollarni yaratadi va QR kodlarini yangilaydi.
+
+    Yo'q stollar bitta bulk INSERT bilan yaratiladi, QR rasmlar thread
+    pool'da chiziladi va yo'llari bitta bulk UPDATE bilan saqlanadi.
+    """
+    short_name = safe_filename(
+        organization.short_name or f"org_{organization.id}")
+    numbers = [str(number) for number in range(1, table_count + 1)]
+
+    existing = set(organization.tables.filter(
+        number__in=numbers
+    ).values_list('number', flat=True))
+    # parallel job shu raqamni yaratib ulgurgan bo'lsa, unique constraint
+    # dublikatni o'tkazib yuboradi
+    Table.objects.bulk_create([
+        Table(organization=organization, number=number)
+        for number in numbers if number not in existing
+    ], ignore_conflicts=True)
+    tables = {
+        table.number: table
+        for table in organization.tables.filter(number__in=numbers)
+    }
+
+    if not settings.QR_CODE_FILES:
+        # QR kodlar so'rov paytida chiziladi (api/v1/qr/...)
+        return [tables[number] for number in numbers]
+
+    with ThreadPoolExecutor(max_workers=settings.QR_CODE_WORKERS) as executor:
+        qr_code_paths = executor.map(
+            lambda number: create_qr_code_for_tables(short_name, number),
+            numbers
+        )
+        for number, qr_code_path in zip(numbers, qr_code_paths):
+            tables[number].qr_code = qr_code_path
+
+    Table.objects.bulk_update(tables.values(), ['qr_code'], batch_size=500)
+    return [tables[number] for number in numbers]
+
+
+def start_table_batch_job(organization, table_count):
+    """
+    Job shu jarayondagi daemon thread'da bajariladi: worker qayta ishga
+    tushsa (deploy) job to'xtaydi va qayta urinilmaydi. Bunday job
+    ``TABLE_BATCH_JOB_TIMEOUT`` dan keyin ``fail_stale_table_batch_jobs``
+    orqali ``failed`` bo'ladi; stollarni yaratish idempotent, so'rovni
+    qayta yuborish mumkin.
+    """
+    job = TableBatchJob.objects.create(
+        organization=organization,
+        table_count=table_count
+    )
+    transaction.on_commit(lambda: threading.Thread(
+        target=run_table_batch_job, args=(job.pk,), daemon=True
+    ).start())
+    return job
+
+
+def fail_stale_table_batch_jobs(queryset=None):
+    """
+    ``TABLE_BATCH_JOB_TIMEOUT`` dan beri yangilanmagan ``pending``/``running``
+    job'larni ``failed`` qiladi (thread o'lgan).
+    """
+    if queryset is None:
+        queryset = TableBatchJob.objects.all()
+    return queryset.filter(
+        status__in=['pending', 'running'],
+        updated_at__lt=timezone.now() - timedelta(
+            seconds=settings.TABLE_BATCH_JOB_TIMEOUT),
+    ).update(
+        status='failed',
+        error="Job to'xtab qolgan (worker qayta ishga tushgan bo'lishi mumkin)",
+        updated_at=timezone.now(),
+    )
+
+
+def run_table_batch_job(job_id):
+    job = TableBatchJob.objects.select_related('organization').get(pk=job_id)
+    try:
+        job.status = 'running'
+        job.save(update_fields=['status', 'updated_at'])
+        tables = create_tables_with_qr_codes(job.organization, job.table_count)
+        job.result = [
+            {"id": table.id, "number": table.number,
+             "qr_code": table.qr_code.name}
+            for table in tables
+        ]
+        job.status = 'done'
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        job.save()
+        # thread o'z ulanishini yopishi kerak
+        connection.close()
+
+
+def add_table_label(image, text):
+    """
+    QR ostiga stol raqamini yozadi. Standart bitmap shrift kichik, shuning
+    uchun yozuv alohida chizilib, QR kengligining yarmigacha kattalashtiriladi.
+    """
+    image = image.convert('L')
+    font = ImageFont.load_default()
+    left, top, right, bottom = font.getbbox(text)
+    label = Image.new('L', (right - left + 2, bottom - top + 2), 255)
+    ImageDraw.Draw(label).text((1 - left, 1 - top), text, font=font, fill=0)
+    scale = max(1, image.width // 2 // label.width)
+    label = label.resize(
+        (label.width * scale, label.height * scale), Image.NEAREST)
+
+    margin = label.height // 2
+    sheet = Image.new(
+        'L', (image.width, image.height + label.height + margin), 255)
+    sheet.paste(image, (0, 0))
+    sheet.paste(label, ((image.width - label.width) // 2, image.height))
+    return sheet
+
+
+def labeled_table_qr_png(organization_name, table):
+    """
+    Stolning saqlangan QR rasmini (bo'lmasa yangi chizilganini) raqami
+    bilan PNG qilib qaytaradi.
+    """
+    image = None
+    if table.qr_code:
+        try:
+            with table.qr_code.open('rb') as file:
+                image = Image.open(file)
+                image.load()
+        except OSError:
+            image = None
+    if image is None:
+        image = qrcode.make(
+            table_qr_data(organization_name, table.number)).get_image()
+
+    buffer = BytesIO()
+    add_table_label(image, f"Stol {table.number}").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def iter_table_qr_codes(organization):
+    """
+    ``(fayl nomi, PNG)`` juftliklarini stollar tartibida beradi. Rasmlar
+    thread pool'da ``QR_CODE_WORKERS * 4`` talik partiyalar bilan
+    tayyorlanadi, shuning uchun xotirada faqat bitta partiya turadi.
+    """
+    short_name = safe_filename(
+        organization.short_name or f"org_{organization.id}")
+    tables = organization.tables.order_by('id').only(
+        'id', 'number', 'qr_code').iterator()
+    batch_size = settings.QR_CODE_WORKERS * 4
+
+    with ThreadPoolExecutor(max_workers=settings.QR_CODE_WORKERS) as executor:
+        while batch := list(islice(tables, batch_size)):
+            images = executor.map(
+                lambda table: labeled_table_qr_png(short_name, table), batch)
+            for table, image in zip(batch, images):
+                yield f"{short_name}_{safe_filename(table.number)}.png", image
+
+
+class StreamBuffer:
+    """
+    ``ZipFile`` yozadigan baytlarni navbatdagi chunk sifatida beradi.
+    ``tell()`` yo'q: ZipFile seek qilmasdan data descriptor'lar bilan yozadi.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
 
-    # Fayl mavjud bo'lmasa, saqlaymiz
-    if not os.path.exists(full_path):
-        with open(full_path, 'wb') as f:
-            f.write(buffer.read())
 
-    return relative_path
+def stream_table_qr_zip(organization):
+    buffer = StreamBuffer()
+    # PNG allaqachon siqilgan
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for name, image in iter_table_qr_codes(organization):
+            archive.writestr(name, image)
+            yield buffer.pop()
+    yield buffer.pop()
@@ -1,6 +1,17 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import quote_etag
+from django.views import View
 from rest_framework import filters
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.generics import CreateAPIView, ListAPIView, UpdateAPIView, DestroyAPIView, RetrieveAPIView
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -8,8 +19,31 @@ from rest_framework import status
 
 from django_filters.rest_framework import DjangoFilterBackend
 
-from bot.bot import send_confirmation_message_to_user
-from .utils import create_qr_code_for_tables, safe_filename
+from bot.outbox import enqueue_confirmation_message
+from eateries.events import order_events
+from eateries.images import (
+    IMAGE_ERRORS,
+    get_resized_image_cache,
+    open_image,
+    render_variant,
+    resized_image_key,
+)
+from .conditional import ConditionalListMixin, conditional_response, make_etag
+from .idempotency import IdempotentCreateMixin
+from .menu import get_menu
+from .renderers import CompactMenuRenderer
+from .search import RankedSearchFilter
+from .pagination import CreatedAtCursorPagination
+from .utils import (
+    create_tables_with_qr_codes,
+    fail_stale_table_batch_jobs,
+    render_table_qr,
+    safe_filename,
+    start_table_batch_job,
+    stream_table_qr_zip,
+    table_qr_code_url,
+    table_qr_data,
+)
 from .swagger_docs import table_create_schema, table_in_organization, cheking_phone_number, filter_for_table, filter_for_wifi, checking_token
 from api.serializers import (
     CurrencySerializer,
@@ -19,7 +53,11 @@ from api.serializers import (
     ProductSerializer,
     TableSerializer,
     TableCreateCollectionSerializer,
+    TableBatchJobSerializer,
     OrderCreateSerializer,
+    OrderReadSerializer,
+    OrderSnapshotReadSerializer,
+    OrderStatusBulkSerializer,
     UserCreateSerializer,
     PhoneCheckSerializer,
     CheckTokenSerializer,
@@ -31,15 +69,18 @@ from eateries.models import (
     Category,
     Product,
     Table,
+    TableBatchJob,
     Order,
+    ProductOrder,
     UserProfile,
 )
 
 
 # < ========= Currency ========= >
-class CurrencyListAPIView(ListAPIView):
+class CurrencyListAPIView(ConditionalListMixin, ListAPIView):
     serializer_class = CurrencySerializer
     queryset = Currency.objects.all()
+    cache_control = {'public': True, 'max_age': 60 * 60}
 
 
 # < ========= WiFi ========= >
@@ -53,7 +94,7 @@ class WiFiListAPIView(ListAPIView):
     serializer_class = WiFiSerializer
     queryset = WiFi.objects.all()
     parser_classes = (MultiPartParser, FormParser)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter]
     filterset_fields = ("organization",)
     search_fields = ("name", "password")
 
@@ -99,7 +140,7 @@ class OrganizationUpdateAPIView(UpdateAPIView):
 
 
 # < ========= Category ========= >
-class CategoryListAPIView(ListAPIView):
+class CategoryListAPIView(ConditionalListMixin, ListAPIView):
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
     parser_classes = (MultiPartParser, FormParser)
@@ -118,24 +159,28 @@ class ProductCreateAPIView(CreateAPIView):
     # parser_classes = (MultiPartParser, FormParser)
 
 
-class ProductListAPIView(ListAPIView):
+class ProductListAPIView(ConditionalListMixin, ListAPIView):
     serializer_class = ProductSerializer
-    queryset = Product.objects.all()
+    queryset = ProductSerializer.setup_eager_loading(Product.objects.all())
+    validator_fields = (
+        'updated_at', 'category__updated_at', 'images__updated_at')
+    validator_counts = ('images',)
     parser_classes = (MultiPartParser, FormParser)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter]
     filterset_fields = ("organization", "category")
     search_fields = ("name", "description")
+    pagination_class = CreatedAtCursorPagination
 
 
 class ProductDetailAPIView(RetrieveAPIView):
     serializer_class = ProductSerializer
-    queryset = Product.objects.all()
+    queryset = ProductSerializer.setup_eager_loading(Product.objects.all())
     parser_classes = (MultiPartParser, FormParser)
 
 
 class ProductUpdateAPIView(UpdateAPIView):
     serializer_class = ProductSerializer
-    queryset = Product.objects.all()
+    queryset = ProductSerializer.setup_eager_loading(Product.objects.all())
 
     def partial_update(self, request, *args, **kwargs):
         kwargs['partial'] = True
@@ -162,27 +207,25 @@ class TableCreateCollectionAPIView(APIView):
         if not organization:
             return Response({"error": "Organization not found"}, status=404)
 
-        short_name = safe_filename(
-            organization.short_name or f"org_{organization.id}")
-        created_tables = []
-
-        for table_number in range(1, int(table_count) + 1):
-            table, _ = Table.objects.get_or_create(
-                organization=organization,
-                number=table_number
+        if table_count > settings.TABLE_BATCH_SYNC_LIMIT:
+            job = start_table_batch_job(organization, table_count)
+            return Response(
+                TableBatchJobSerializer(
+                    job, context={"request": request}).data,
+                status=202
             )
 
-            qr_code_path = create_qr_code_for_tables(
-                short_name, str(table_number))
-            table.qr_code = qr_code_path
-            table.save()
-
-            created_tables.append({
+        tables = create_tables_with_qr_codes(organization, table_count)
+        created_tables = [
+            {
                 "id": table.id,
                 "number": table.number,
-                "qr_code": request.build_absolute_uri(table.qr_code.url)
-                if hasattr(table.qr_code, 'url') else table.qr_code
-            })
+                "qr_code": table_qr_code_url(
+                    request, organization.short_name,
+                    table.number, table.qr_code.name)
+            }
+            for table in tables
+        ]
 
         return Response({
             "tables": created_tables
@@ -194,9 +237,83 @@ class TableCreateCollectionAPIView(APIView):
         return Table.objects.all()
 
 
+class TableBatchJobAPIView(RetrieveAPIView):
+    serializer_class = TableBatchJobSerializer
+    queryset = TableBatchJob.objects.all()
+
+    def get_object(self):
+        fail_stale_table_batch_jobs(
+            self.get_queryset().filter(pk=self.kwargs['pk']))
+        return super().get_object()
+
+
+class TableQRCodeExportAPIView(APIView):
+    """
+    Tashkilotning barcha stollari QR kodlarini (raqami yozilgan) bitta ZIP
+    qilib oqim bilan yuboradi.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, organization_id):
+        organization = Organization.objects.filter(id=organization_id).first()
+        if not organization:
+            return Response({"error": "Organization not found"}, status=404)
+        if organization.user_id != request.user.id:
+            return Response(
+                {"error": "You do not own this organization"}, status=403)
+
+        response = StreamingHttpResponse(
+            stream_table_qr_zip(organization),
+            content_type='application/zip'
+        )
+        filename = safe_filename(
+            organization.short_name or f"org_{organization.id}")
+        response['Content-Disposition'] = (
+            f'attachment; filename="qr_{filename}.zip"')
+        return response
+
+
+class TableQRCodeView(View):
+    """
+    Stol QR kodini so'rov paytida chizadi (PNG yoki SVG). Chizilgan kodlar
+    jarayon ichidagi LRU keshda turadi, javob uzoq keshlanadi.
+    """
+    content_types = {
+        'png': 'image/png',
+        'svg': 'image/svg+xml',
+    }
+
+    def get(self, request, short_name, number, fmt):
+        if fmt not in self.content_types:
+            raise Http404
+        # mavjud QR fayllar bilan bir xil URL
+        qr_data = table_qr_data(safe_filename(short_name), number)
+
+        def build_response():
+            if not Table.objects.filter(
+                organization__short_name=short_name,
+                number=number
+            ).exists():
+                raise Http404
+            return HttpResponse(
+                render_table_qr(qr_data, fmt),
+                content_type=self.content_types[fmt]
+            )
+
+        return conditional_response(
+            request,
+            build_response,
+            etag=make_etag(qr_data, fmt),
+            cache_control={
+                'public': True,
+                'max_age': settings.QR_CODE_MAX_AGE,
+            },
+        )
+
+
 class TableListAPIView(ListAPIView):
     serializer_class = TableSerializer
-    queryset = Table.objects.all()
+    queryset = Table.objects.select_related('organization')
     parser_classes = (MultiPartParser, FormParser)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ("organization",)
@@ -229,19 +346,40 @@ class TableDestroyAPIView(DestroyAPIView):
 
 
 class TableInOrganization(APIView):
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES, CompactMenuRenderer]
+    # telefonlar menyuni bir tashrifda bir necha marta ochadi
+    cache_control = {'public': True, 'max_age': 30}
+
     def get_queryset(self):
         return Organization.objects.all()
 
     @table_in_organization
     def get(self, request, short_name):
         table_number = request.GET.get('t')
+        compact = request.accepted_renderer.format == 'compact'
+        # menyu versiyasi va stol: javobni qurmasdan bitta so'rov
+        validators = Table.objects.filter(
+            organization__short_name=short_name,
+            number=table_number
+        ).values_list(
+            'id', 'updated_at', 'organization__menu_version'
+        ).first()
+        return conditional_response(
+            request,
+            lambda: self.get_menu_response(
+                request, short_name, table_number, compact),
+            etag=make_etag(request.build_absolute_uri(), compact, *validators)
+            if validators else None,
+            cache_control=self.cache_control,
+        )
+
+    def get_menu_response(self, request, short_name, table_number, compact):
         organization = self.get_queryset().filter(
             short_name=short_name
         ).first()
         if not organization:
             return Response({"error": "Organization not found"}, status=404)
-        organization_serializer = OrganizationSerializer(
-            organization, context={"request": request})
 
         table = organization.tables.filter(
             number=table_number
@@ -250,43 +388,58 @@ class TableInOrganization(APIView):
             return Response({"error": "Table not found"}, status=404)
         table_serializer = TableSerializer(table, context={"request": request})
 
-        products = table.organization.products.filter(
-            is_active=True
-        ).order_by("category__name")
-        product_serializer = ProductSerializer(
-            instance=products,
-            many=True,
-            context={"request": request}
-        )
-
+        menu = get_menu(organization, request, compact=compact)
+        if compact:
+            return Response({
+                **menu,
+                "table": table_serializer.data,
+            })
         return Response(
             {
-                "organization": organization_serializer.data,
+                "organization": menu["organization"],
                 "table": table_serializer.data,
-                "products": product_serializer.data
+                "products": menu["products"]
             }
         )
 
 
 # < ========= Order ========= >
-class OrderCreateAPIView(CreateAPIView):
+class OrderCreateAPIView(IdempotentCreateMixin, CreateAPIView):
     queryset = Order.objects.all()
     serializer_class = OrderCreateSerializer
 
 
 class OrderListAPIView(ListAPIView):
-    serializer_class = OrderCreateSerializer
-    queryset = Order.objects.all().order_by('-created_at')
+    serializer_class = OrderReadSerializer
+    queryset = OrderReadSerializer.setup_eager_loading(
+        Order.objects.all()).order_by('-created_at')
+    pagination_class = CreatedAtCursorPagination
     filterset_fields = ("organization", "table", "status", "type", "user")
+    # qisman moslik (icontains); PostgreSQL'da trigram indekslar (0036)
     search_fields = ("organization__short_name", "table__number")
 
 
 class OrderDetailAPIView(RetrieveAPIView):
-    serializer_class = OrderCreateSerializer
-    queryset = Order.objects.all()
+    serializer_class = OrderReadSerializer
+    queryset = OrderReadSerializer.setup_eager_loading(Order.objects.all())
     parser_classes = (MultiPartParser, FormParser)
 
 
+class OrderSnapshotListAPIView(OrderListAPIView):
+    """
+    /api/v2: buyurtma qatorlari faqat snapshotdan, mahsulot o'qilmaydi.
+    """
+    serializer_class = OrderSnapshotReadSerializer
+    queryset = OrderSnapshotReadSerializer.setup_eager_loading(
+        Order.objects.all()).order_by('-created_at')
+
+
+class OrderSnapshotDetailAPIView(OrderDetailAPIView):
+    serializer_class = OrderSnapshotReadSerializer
+    queryset = OrderSnapshotReadSerializer.setup_eager_loading(
+        Order.objects.all())
+
+
 class OrderUpdateAPIView(UpdateAPIView):
     serializer_class = OrderCreateSerializer
     queryset = Order.objects.all()
@@ -301,6 +454,155 @@ class OrderDestroyAPIView(DestroyAPIView):
     queryset = Order.objects.all()
 
 
+class OrderStatusBulkAPIView(APIView):
+    """
+    Bir nechta buyurtma statusini bitta so'rovda o'zgartiradi:
+    ``{"transitions": [{"order_id", "expected_status", "new_status"}]}``.
+    Status allaqachon boshqa bo'lgan buyurtmalar ``conflicts`` da qaytadi.
+    Faqat menejer o'z tashkilotlari buyurtmalarini o'zgartira oladi.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.type != 'manager':
+            return Response(
+                {"error": "Only managers can change order status"},
+                status=403)
+        serializer = OrderStatusBulkSerializer(
+            data=request.data, context={"request": request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        return Response(serializer.save())
+
+
+class KitchenQueueAPIView(APIView):
+    """
+    Tashkilotning ``waiting`` buyurtmalaridagi har bir mahsulot umumiy
+    soni, kategoriya bo'yicha guruhlangan. ``ProductOrder`` ustidan bitta
+    agregat so'rov: nom va kategoriya buyurtma qatoridagi snapshotdan olinadi.
+    """
+
+    def get(self, request, organization_id):
+        rows = ProductOrder.objects.filter(
+            order__organization_id=organization_id,
+            order__status='waiting',
+        ).values('product_id').annotate(
+            # mahsulot buyurtmalar orasida qayta nomlangan bo'lishi mumkin
+            name=Max('product_name'),
+            category=Max('category_name'),
+            quantity=Sum('quantity'),
+            # (order, product) unique: qatorlar soni = buyurtmalar soni
+            orders=Count('id'),
+        ).order_by('category', 'name')
+
+        categories = {}
+        for row in rows:
+            categories.setdefault(row['category'], []).append({
+                'product_id': row['product_id'],
+                'name': row['name'],
+                'quantity': row['quantity'],
+                'orders': row['orders'],
+            })
+        return Response({
+            'organization': organization_id,
+            'categories': [
+                {'name': name, 'products': products}
+                for name, products in categories.items()
+            ],
+        })
+
+
+class OrderEventStreamView(View):
+    """
+    Tashkilot buyurtmalari hodisalarini Server-Sent Events orqali uzatadi.
+
+    ASGI ostida ishlashi kerak (WSGI async generatorni oxirigacha o'qib
+    oladi). Ulanish ``ORDER_EVENTS_STREAM_TIMEOUT`` dan keyin yopiladi va
+    EventSource ``Last-Event-ID`` bilan qayta ulanib, o'tkazib yuborilgan
+    hodisalarni oladi.
+    """
+
+    async def get(self, request, organization_id):
+        last_event_id = request.headers.get(
+            'Last-Event-ID', request.GET.get('last_event_id'))
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return JsonResponse({"error": "Invalid last event id"}, status=400)
+
+        response = StreamingHttpResponse(
+            self.stream(organization_id, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, organization_id, last_event_id):
+        queue, backlog = order_events.subscribe(organization_id, last_event_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.ORDER_EVENTS_STREAM_TIMEOUT
+        try:
+            yield "retry: 3000\n\n"
+            for event in backlog:
+                yield self.format_event(event)
+            while loop.time() < deadline:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.ORDER_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield self.format_event(event)
+        finally:
+            order_events.unsubscribe(organization_id, queue)
+
+    @staticmethod
+    def format_event(event):
+        return "id: {}\nevent: {}\ndata: {}\n\n".format(
+            event["id"], event["type"], json.dumps(event["data"])
+        )
+
+
+class ResizedImageView(View):
+    """
+    Media rasmini so'ralgan kenglikda qaytaradi (variantlari bo'lmagan eski
+    rasmlar uchun). Format ``Accept`` bo'yicha tanlanadi: WebP yoki JPEG.
+    Natija diskdagi LRU keshda saqlanadi.
+    """
+
+    def get(self, request, width, path):
+        if width not in settings.IMAGE_RESIZE_WIDTHS:
+            return JsonResponse({"error": "Unsupported width"}, status=400)
+        fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') \
+            else 'jpeg'
+        try:
+            if not default_storage.exists(path):
+                raise Http404
+            key = resized_image_key(path, width, fmt)
+        except SuspiciousFileOperation:
+            raise Http404
+
+        def build_response():
+            try:
+                file = get_resized_image_cache().open_or_render(
+                    key, lambda: render_variant(open_image(path), width, fmt))
+            except IMAGE_ERRORS:
+                # rasm emas, buzilgan yoki juda katta fayl
+                raise Http404
+            return FileResponse(file, content_type=f'image/{fmt}')
+
+        return conditional_response(
+            request,
+            build_response,
+            etag=quote_etag(key),
+            cache_control={
+                'public': True,
+                'max_age': settings.IMAGE_RESIZE_MAX_AGE,
+            },
+        )
+
+
 class OrganizationCategoryListAPIView(APIView):
     def get_queryset(self):
         return Category.objects.all()
@@ -345,7 +647,9 @@ class PhoneCheckAPIView(APIView):
                 phone_number=phone_number
             )
             if not created:
-                send_confirmation_message_to_user(user_id=user.telegram_id)
+                # Telegram'ga so'rov fonda, runoutbox orqali yuboriladi
+                if user.telegram_id:
+                    enqueue_confirmation_message(user.telegram_id)
                 return Response({"user_id": user.id, "exists": True, "has_confirmation_message_been_sent": True})
             else:
                 return Response({"user_id": user.id, "exists": False, "has_confirmation_message_been_sent": False})
@@ -79,30 +79,31 @@ def phone_number(update: Update, context: CallbackContext) -> None:
 
 
 def send_confirmation_message_to_user(user_id):
-    try:
-        message = "🔔 Tizimga kirishingizni tasdiqlang:"
-        bot.send_message(
-            chat_id=user_id,
-            text=message,
-            reply_markup=ReplyKeyboardMarkup(
+    """
+    Xatolarni yutmaydi: qayta urinishni outbox sender hal qiladi
+    (bot/outbox.py).
+    """
+    message = "🔔 Tizimga kirishingizni tasdiqlang:"
+    bot.send_message(
+        chat_id=user_id,
+        text=message,
+        reply_markup=ReplyKeyboardMarkup(
+            [
                 [
-                    [
-                        KeyboardButton(
-                            "✅Tasdiqlash",
-                        ),
-                        KeyboardButton(
-                            "🚫Bekor qilish",
-                        )
-                    ]
-                ],
-                one_time_keyboard=True,
-                resize_keyboard=True,
-                row_width=2,
-
-            )
+                    KeyboardButton(
+                        "✅Tasdiqlash",
+                    ),
+                    KeyboardButton(
+                        "🚫Bekor qilish",
+                    )
+                ]
+            ],
+            one_time_keyboard=True,
+            resize_keyboard=True,
+            row_width=2,
+
         )
-    except Exception as e:
-        print(f"Error sending message: {e}")
+    )
 
 
 def keyboards_handle_message(update: Update, context: CallbackContext):
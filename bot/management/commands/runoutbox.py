@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bot.outbox import RateLimiter, drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Telegram outbox xabarlarini fonda yuboradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Navbatni bir marta bo'shatib, to'xtaydi (cron uchun)"
+        )
+
+    def handle(self, *args, **kwargs):
+        rate_limiter = RateLimiter(
+            per_second=settings.TELEGRAM_RATE_LIMIT,
+            per_chat_interval=settings.TELEGRAM_CHAT_INTERVAL
+        )
+        while True:
+            sent = drain_outbox(rate_limiter)
+            if sent:
+                continue
+            if kwargs['once']:
+                break
+            time.sleep(settings.TELEGRAM_OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,63 @@
+from django.db import models
+from django.utils import timezone
+
+from eateries.models import BaseModel
+
+
+class OutboxMessage(BaseModel):
+    KINDS = [
+        ('confirmation', 'Login confirmation'),
+    ]
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(
+        max_length=32,
+        choices=KINDS,
+        verbose_name='Kind'
+    )
+    chat_id = models.CharField(
+        max_length=20,
+        verbose_name='Chat ID'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default='pending',
+        verbose_name='Status'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Attempts'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Next attempt at'
+    )
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Last error'
+    )
+    sent_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Sent at'
+    )
+
+    def __str__(self) -> str:
+        return " | ".join([self.kind, self.chat_id, self.status])
+
+    class Meta:
+        verbose_name = 'Outbox message'
+        verbose_name_plural = 'Outbox messages'
+        indexes = [
+            # sender faqat navbatdagi xabarlarni oladi
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='outbox_pending_idx'
+            ),
+        ]
@@ -0,0 +1,124 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from telegram.error import BadRequest, RetryAfter, Unauthorized
+
+from .bot import send_confirmation_message_to_user
+from .models import OutboxMessage
+
+SENDERS = {
+    'confirmation': send_confirmation_message_to_user,
+}
+
+
+def enqueue_confirmation_message(chat_id):
+    return OutboxMessage.objects.create(kind='confirmation', chat_id=chat_id)
+
+
+class RateLimiter:
+    """
+    Telegram limitlari: umumiy ``per_second`` xabar va bitta chatga
+    ``per_chat_interval`` soniyada bittadan ko'p emas.
+    """
+
+    def __init__(self, per_second, per_chat_interval):
+        self.interval = 1 / per_second
+        self.per_chat_interval = per_chat_interval
+        self.last_sent = 0
+        self.last_sent_to_chat = {}
+
+    def wait(self, chat_id):
+        now = time.monotonic()
+        ready_at = max(
+            self.last_sent + self.interval,
+            self.last_sent_to_chat.get(chat_id, 0) + self.per_chat_interval
+        )
+        if ready_at > now:
+            time.sleep(ready_at - now)
+            now = ready_at
+        self.last_sent = now
+        self.last_sent_to_chat[chat_id] = now
+        # eski chatlar xotirada to'planib qolmasin
+        if len(self.last_sent_to_chat) > 10000:
+            self.last_sent_to_chat = {
+                chat: sent for chat, sent in self.last_sent_to_chat.items()
+                if sent > now - self.per_chat_interval
+            }
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(
+        settings.TELEGRAM_OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1),
+        settings.TELEGRAM_OUTBOX_BACKOFF_MAX
+    ))
+
+
+def claim_batch(batch_size):
+    """
+    Navbatdagi xabarlarni oladi. PostgreSQL'da bir nechta sender bir xil
+    xabarni olmasligi uchun qatorlar SKIP LOCKED bilan qulflanadi.
+    """
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+                status='pending',
+                next_attempt_at__lte=timezone.now()
+            ).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        # boshqa sender lease tugaguncha bu xabarlarni olmaydi
+        OutboxMessage.objects.filter(
+            id__in=[message.id for message in messages]
+        ).update(next_attempt_at=timezone.now() + timedelta(
+            seconds=settings.TELEGRAM_OUTBOX_LEASE))
+    return messages
+
+
+def send_message(message, rate_limiter):
+    message.attempts += 1
+    try:
+        rate_limiter.wait(message.chat_id)
+        SENDERS[message.kind](message.chat_id)
+    except RetryAfter as e:
+        # Telegram o'zi kutish vaqtini aytadi, urinish hisoblanmaydi
+        message.attempts -= 1
+        message.next_attempt_at = timezone.now() + timedelta(
+            seconds=e.retry_after)
+        message.last_error = str(e)
+    except (BadRequest, Unauthorized) as e:
+        # chat topilmadi yoki foydalanuvchi botni bloklagan
+        message.status = 'failed'
+        message.last_error = str(e)
+    except Exception as e:
+        message.last_error = str(e)
+        if message.attempts >= settings.TELEGRAM_OUTBOX_MAX_ATTEMPTS:
+            message.status = 'failed'
+        else:
+            message.next_attempt_at = timezone.now() + backoff(
+                message.attempts)
+    else:
+        message.status = 'sent'
+        message.sent_at = timezone.now()
+        message.last_error = None
+
+
+def drain_outbox(rate_limiter, batch_size=None):
+    """
+    Bitta partiyani yuboradi va natijalarni bitta bulk UPDATE bilan saqlaydi.
+    Yuborilgan (urinilgan) xabarlar sonini qaytaradi.
+    """
+    messages = claim_batch(batch_size or settings.TELEGRAM_OUTBOX_BATCH_SIZE)
+    for message in messages:
+        send_message(message, rate_limiter)
+        message.updated_at = timezone.now()
+    OutboxMessage.objects.bulk_update(messages, [
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'last_error',
+        'sent_at',
+        'updated_at',
+    ])
+    return len(messages)
@@ -1,3 +1,49 @@
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+
+from bot.models import OutboxMessage
+from bot.outbox import RateLimiter, drain_outbox
+from eateries.models import UserProfile
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.rate_limiter = RateLimiter(per_second=1000, per_chat_interval=0)
+
+    def drain(self, sender):
+        with mock.patch.dict("bot.outbox.SENDERS", {"confirmation": sender}):
+            return drain_outbox(self.rate_limiter)
+
+    def test_phone_check_enqueues_message(self):
+        UserProfile.objects.create(
+            phone_number="+998901234567", telegram_id="12345")
+        with mock.patch("bot.bot.bot.send_message") as send_message:
+            response = self.client.post(
+                "/api/v1/users/confirmation/",
+                {"phone_number": "+998901234567"},
+                content_type="application/json",
+            )
+        self.assertTrue(response.json()["has_confirmation_message_been_sent"])
+        send_message.assert_not_called()
+        self.assertTrue(OutboxMessage.objects.filter(
+            chat_id="12345", status="pending").exists())
+
+    def test_sent_message_is_marked(self):
+        OutboxMessage.objects.create(kind="confirmation", chat_id="1")
+        sender = mock.Mock()
+        self.assertEqual(self.drain(sender), 1)
+        sender.assert_called_once_with("1")
+        self.assertEqual(OutboxMessage.objects.get().status, "sent")
+        self.assertEqual(self.drain(sender), 0)
+
+    def test_failed_message_is_retried_with_backoff(self):
+        OutboxMessage.objects.create(kind="confirmation", chat_id="1")
+        self.drain(mock.Mock(side_effect=ConnectionError("timeout")))
 
-# Create your tests here.
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, "pending")
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertEqual(self.drain(mock.Mock()), 0)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from environs import Env
 
 env = Env()
@@ -94,6 +97,10 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+if env.str('DB_ENGINE') == 'postgresql':
+    # full-text va trigram qidiruv (api/search.py)
+    INSTALLED_APPS.append('django.contrib.postgres')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -151,6 +158,29 @@ MEDIA_URL = 'media/'
 
 MEDIA_ROOT = BASE_DIR / 'media/'
 
+STORAGES = {
+    # kontent xeshi bo'yicha nomlash va dublikatlarni bitta faylga
+    # birlashtirish; mavjud fayllar: python manage.py migrate_media_to_cas
+    'default': {
+        'BACKEND': env.str(
+            'MEDIA_STORAGE_BACKEND',
+            'eateries.storage.ContentAddressedStorage'
+        ),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Media serving (eateries.views.serve_media)
+MEDIA_CACHE_MAX_AGE = 60 * 60  # s; kontent xeshli nomlar — 1 yil, immutable
+MEDIA_CHUNK_SIZE = 64 * 1024
+# 'X-Accel-Redirect' (nginx) yoki 'X-Sendfile' (Apache/lighttpd)
+MEDIA_SENDFILE_HEADER = env.str('MEDIA_SENDFILE_HEADER', '')
+# nginx: location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+MEDIA_ACCEL_REDIRECT_PREFIX = env.str(
+    'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -200,9 +230,87 @@ CORS_ALLOW_METHODS = ('DELETE', 'GET', 'OPTIONS', 'PATCH', 'POST', 'PUT')
 CORS_ALLOW_HEADERS = ('accept', 'authorization', 'content-type',
                       'user-agent', 'x-csrftoken', 'x-requested-with')
 
+# Cache
+# Web va runbot jarayonlari keshni bo'lishishi kerak: runbot foydalanuvchini
+# tasdiqlaganda/bekor qilganda web jarayondagi auth kesh ham tozalanadi.
+# Shuning uchun standart backend fayl keshi (yoki Redis/Memcached).
+CACHE_BACKEND = env.str(
+    'CACHE_BACKEND',
+    'django.core.cache.backends.filebased.FileBasedCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': env.str(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodlist_cache')
+        ),
+    }
+}
+
+# 0 — auth kesh o'chirilgan
+AUTH_USER_CACHE_TIMEOUT = env.int('AUTH_USER_CACHE_TIMEOUT', 60)  # s
+TOKEN_CHECK_CACHE_TIMEOUT = env.int(
+    'TOKEN_CHECK_CACHE_TIMEOUT', 60 * 60)  # s, token_expiry dan oshmaydi
+
+if (CACHE_BACKEND.endswith('.LocMemCache')
+        and (AUTH_USER_CACHE_TIMEOUT or TOKEN_CHECK_CACHE_TIMEOUT)):
+    raise ImproperlyConfigured(
+        "LocMemCache is per-process: runbot cannot evict cached users. "
+        "Use a shared CACHE_BACKEND or set AUTH_USER_CACHE_TIMEOUT=0 "
+        "and TOKEN_CHECK_CACHE_TIMEOUT=0."
+    )
+
+# Table QR generation
+QR_CODE_WORKERS = 4
+# False: QR fayllar yozilmaydi, api/v1/qr/<short_name>/<number>.png ishlatiladi
+QR_CODE_FILES = env.bool('QR_CODE_FILES', True)
+QR_CODE_CACHE_SIZE = 1024  # jarayon ichidagi LRU, ~1 KB PNG
+QR_CODE_MAX_AGE = 7 * 24 * 60 * 60  # s
+TABLE_BATCH_SYNC_LIMIT = 50  # bundan ko'p stollar fon job sifatida yaratiladi
+# shuncha vaqt yangilanmagan job to'xtagan hisoblanadi (thread deploy'da o'ladi)
+TABLE_BATCH_JOB_TIMEOUT = 10 * 60  # s
+
+# Image variants (eateries/images.py)
+IMAGE_VARIANT_WIDTHS = (160, 640)  # px; 160 — menyudagi 80px thumbnail, 2x ekran
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+IMAGE_PLACEHOLDER_WIDTH = 16  # px, base64 JPEG ~0.5 KB
+
+# On-demand resize (api/v1/images/<width>/<path>)
+IMAGE_RESIZE_WIDTHS = (80, 160, 320, 480, 640, 960, 1280)
+# repo ichida emas: deploy/git clean kesh fayllariga tegmasin
+IMAGE_RESIZE_CACHE_DIR = env.str(
+    'IMAGE_RESIZE_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'foodlist_images')
+)
+IMAGE_RESIZE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+IMAGE_RESIZE_MAX_AGE = 30 * 24 * 60 * 60  # s
+
+ORDER_STATUS_BULK_LIMIT = 200  # api/v1/orders/status/
+
+# Idempotency-Key (buyurtma yaratish)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # s
+
+# Order event stream (SSE)
+ORDER_EVENTS_HISTORY = 1000  # har bir tashkilot uchun
+ORDER_EVENTS_HEARTBEAT = 15  # s
+ORDER_EVENTS_STREAM_TIMEOUT = 300  # s, keyin EventSource qayta ulanadi
+
 TELEGRAM_BOT_TOKEN = env.str('TELEGRAM_BOT_TOKEN')
 TOKEN_VALIDITY_PERIOD = env.int('TOKEN_VALIDITY_PERIOD')  # h
 
+# Telegram outbox (python manage.py runoutbox)
+TELEGRAM_OUTBOX_BATCH_SIZE = 50
+TELEGRAM_OUTBOX_POLL_INTERVAL = 1  # s, navbat bo'sh bo'lganda
+TELEGRAM_OUTBOX_LEASE = 60  # s, olingan xabar boshqa senderga berilmaydi
+TELEGRAM_OUTBOX_MAX_ATTEMPTS = 5
+TELEGRAM_OUTBOX_BACKOFF_BASE = 5  # s
+TELEGRAM_OUTBOX_BACKOFF_MAX = 15 * 60  # s
+TELEGRAM_RATE_LIMIT = 25  # xabar/s, Telegram limiti ~30
+TELEGRAM_CHAT_INTERVAL = 1  # s, bitta chatga
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -9,6 +9,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
 from api.views import TableInOrganization
+from eateries.views import serve_media
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -37,10 +38,15 @@ urlpatterns = [
     path("swagger.json", schema_view.without_ui(
         cache_timeout=0), name='schema-json'),
     path("api/v1/", include("api.urls")),
+    path("api/v2/", include("api.urls_v2")),
     path(
         "data/<str:short_name>",
         TableInOrganization.as_view(),
     ),
+    # static() faqat DEBUG'da ishlaydi va faylni to'liq o'qiydi
+    path(
+        f"{settings.MEDIA_URL.lstrip('/')}<path:path>",
+        serve_media,
+    ),
 ]
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,59 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# < ========= Authenticated user cache ========= >
+# Keshdagi yozuv ``(generation, user)`` ko'rinishida. ``evict_auth_user``
+# foydalanuvchi generatsiyasini ``cache.incr`` bilan atomar oshiradi va
+# oldingi barcha yozuvlar o'qilganda eskirgan hisoblanadi. Eviction
+# runbot va boshqa worker'larga yetishi uchun kesh umumiy bo'lishi kerak
+# (settings.CACHES, LocMemCache ruxsat etilmaydi).
+def _auth_user_generation_key(user_id):
+    return f"auth_user_generation:{user_id}"
+
+
+def auth_user_cache_key(user_id, token):
+    """
+    Kesh kaliti foydalanuvchi id'si va tokenga bog'langan.
+    """
+    token_id = token.get('jti') or hashlib.sha256(
+        str(token).encode()).hexdigest()
+    return f"auth_user:{user_id}:{token_id}"
+
+
+def get_auth_user(cache_key):
+    entry = cache.get(cache_key)
+    if entry is None:
+        return None
+    generation, user = entry
+    if cache.get(_auth_user_generation_key(user.pk)) != generation:
+        return None
+    return user
+
+
+def set_auth_user(cache_key, user, timeout=None):
+    if timeout is None:
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+    generation_key = _auth_user_generation_key(user.pk)
+    # generatsiya kaliti keshdan chiqib ketsa, yangisi eski yozuvlarnikiga
+    # teng bo'lmasligi uchun vaqtdan boshlanadi
+    cache.add(generation_key, time.time_ns(), None)
+    generation = cache.get(generation_key)
+    if generation is not None:
+        cache.set(cache_key, (generation, user), timeout)
+
+
+def token_check_cache_key(token_digest):
+    return f"token_check:{token_digest}"
+
+
+def evict_auth_user(*user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(_auth_user_generation_key(user_id))
+        except ValueError:
+            # kalit yo'q: bu foydalanuvchining yozuvlari allaqachon eskirgan
+            pass
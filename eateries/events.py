@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+
+
+class OrderEventBroker:
+    """
+    Buyurtma hodisalari uchun jarayon ichidagi (in-process) broker.
+
+    Hodisalar tashkilot bo'yicha oxirgi ``history_size`` tasi bilan saqlanadi,
+    shuning uchun qayta ulangan mijoz ``Last-Event-ID`` dan keyingi
+    hodisalarni oladi. Obunachilar asyncio navbatlari orqali xabardor qilinadi,
+    ``publish`` esa istalgan (sync) threaddan chaqirilishi mumkin.
+    """
+
+    def __init__(self, history_size=1000):
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._history_size = history_size
+        self._history = {}
+        self._subscribers = {}
+
+    def publish(self, organization_id, event_type, data):
+        with self._lock:
+            self._last_id += 1
+            event = {"id": self._last_id, "type": event_type, "data": data}
+            self._history.setdefault(
+                organization_id, deque(maxlen=self._history_size)
+            ).append(event)
+            subscribers = list(self._subscribers.get(organization_id, ()))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # event loop yopilgan, obunachi unsubscribe qilinmay qolgan
+                self.unsubscribe(organization_id, queue)
+        return event
+
+    def subscribe(self, organization_id, last_event_id=None):
+        """
+        Navbat va ``last_event_id`` dan keyin o'tkazib yuborilgan hodisalarni
+        qaytaradi. Event loop ichidan chaqirilishi kerak.
+        """
+        queue = asyncio.Queue()
+        with self._lock:
+            history = list(self._history.get(organization_id, ()))
+            if last_event_id is None:
+                backlog = []
+            elif last_event_id > self._last_id:
+                # jarayon qayta ishga tushgan: id'lar boshidan boshlangan
+                backlog = history
+            else:
+                backlog = [e for e in history if e["id"] > last_event_id]
+            self._subscribers.setdefault(organization_id, set()).add(
+                (asyncio.get_running_loop(), queue)
+            )
+        return queue, backlog
+
+    def unsubscribe(self, organization_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(organization_id, set())
+            subscribers.difference_update(
+                {item for item in subscribers if item[1] is queue}
+            )
+            if not subscribers:
+                self._subscribers.pop(organization_id, None)
+
+
+order_events = OrderEventBroker(history_size=settings.ORDER_EVENTS_HISTORY)
+
+
+def order_event_data(order):
+    return {
+        "id": order.id,
+        "organization": order.organization_id,
+        "table": order.table_id,
+        "user": order.user_id,
+        "type": order.type,
+        "status": order.status,
+        "total_price": str(order.total_price),
+        "created_at": order.created_at.isoformat(),
+        "updated_at": order.updated_at.isoformat(),
+    }
+
+
+def publish_order_event_on_commit(order, event_type):
+    """
+    Hodisani tranzaksiya commit bo'lgandan keyin yuboradi. Ma'lumotlar hozir
+    olinadi: o'chirilgan buyurtmaning id'si commitgacha None bo'lib qoladi.
+    """
+    organization_id = order.organization_id
+    data = order_event_data(order)
+    transaction.on_commit(
+        lambda: order_events.publish(organization_id, event_type, data)
+    )
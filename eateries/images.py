@@ -0,0 +1,305 @@
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Category, Organization, ProductImage
+
+logger = logging.getLogger(__name__)
+
+# model: (rasm maydonlari, menyusi o'zgaradigan tashkilotlar lookup'i)
+IMAGE_FIELDS = {
+    Organization: (('logo', 'wallpaper'), 'pk'),
+    Category: (('image',), 'products__category_id'),
+    ProductImage: (('image',), 'products__images__id'),
+}
+
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+ORIENTATION_TAG = 0x0112
+
+# buzilgan yoki zararli (decompression bomb) fayllar
+IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+_executor = None
+
+
+def variant_name(name, width, fmt):
+    root, _ = os.path.splitext(name)
+    return f"{root}_{width}w.{FORMATS[fmt][1]}"
+
+
+def open_image(name, storage=default_storage):
+    with storage.open(name) as file:
+        image = Image.open(file)
+        # telefon rasmlari EXIF orqali aylantirilgan bo'ladi
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    return image
+
+
+def render_placeholder(file):
+    """
+    Rasm o'lchamlari (EXIF aylantirishdan keyin) va kichik JPEG data URI:
+    ``(width, height, placeholder)``.
+    """
+    image = Image.open(file)
+    width, height = image.size
+    if not width or not height:
+        raise ValueError(f"Invalid image size {width}x{height}")
+    # 5-8: rasm 90/270 gradusga aylantirilgan
+    if image.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8):
+        width, height = height, width
+
+    size = settings.IMAGE_PLACEHOLDER_WIDTH
+    # JPEG'ni to'liq o'lchamda dekodlamaslik uchun
+    image.draft('RGB', (size * 4, size * 4))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    image.thumbnail((size, size * height // width or 1), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=50)
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return width, height, f"data:image/jpeg;base64,{data}"
+
+
+def set_placeholder(product_image):
+    """
+    ``ProductImage`` ga o'lcham va placeholder yozadi (saqlamaydi).
+    Yuklangan fayl o'qilgach boshiga qaytariladi.
+    """
+    file = product_image.image.file
+    try:
+        (product_image.width, product_image.height,
+         product_image.placeholder) = render_placeholder(file)
+    except IMAGE_ERRORS:
+        logger.warning("Placeholder failed for %s", product_image.image.name)
+    finally:
+        file.seek(0)
+
+
+def render_variant(image, width, fmt):
+    image = image.copy()
+    # kichik rasmlar kattalashtirilmaydi
+    image.thumbnail((width, image.height), Image.LANCZOS)
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format=FORMATS[fmt][0],
+               quality=settings.IMAGE_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_variants(name, storage=default_storage):
+    """
+    Asl rasm yonida har bir kenglik va format uchun variant saqlaydi.
+
+    Natija modeldagi ``<maydon>_variants`` ga yoziladi:
+    ``{"source": name, "sizes": {"160": {"webp": ..., "jpeg": ...}}}``.
+    """
+    image = open_image(name, storage)
+    sizes = {}
+    for width in settings.IMAGE_VARIANT_WIDTHS:
+        for fmt in settings.IMAGE_VARIANT_FORMATS:
+            try:
+                data = render_variant(image, width, fmt)
+            except IMAGE_ERRORS:
+                logger.warning("Variant %sw %s failed for %s", width, fmt, name)
+                continue
+            sizes.setdefault(str(width), {})[fmt] = storage.save(
+                variant_name(name, width, fmt), ContentFile(data))
+    return {"source": name, "sizes": sizes}
+
+
+def process_image_variants(model, pk, field, name):
+    try:
+        try:
+            variants = generate_variants(name)
+        except IMAGE_ERRORS:
+            # rasm ochilmadi: variantlarsiz qoladi
+            logger.warning("Image variants skipped for %s", name)
+            return
+        # rasm shu orada almashtirilgan bo'lsa, eski variantlar yozilmaydi
+        updated = model.objects.filter(pk=pk, **{field: name}).update(**{
+            f'{field}_variants': variants,
+            'updated_at': timezone.now(),
+        })
+        if updated:
+            # update() signal yubormaydi
+            Organization.objects.filter(
+                **{IMAGE_FIELDS[model][1]: pk}
+            ).bump_menu_version()
+    except Exception:
+        logger.exception("Image variants failed for %s", name)
+    finally:
+        # thread o'z ulanishini yopishi kerak
+        connection.close()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS,
+            thread_name_prefix='image-variants'
+        )
+    return _executor
+
+
+def schedule_image_variants(instance):
+    """
+    Yangi yoki almashtirilgan rasmlar uchun variantlarni tranzaksiya
+    tugagach worker pool'da yaratadi.
+    """
+    model = type(instance)
+    for field in IMAGE_FIELDS[model][0]:
+        image = getattr(instance, field)
+        variants = getattr(instance, f'{field}_variants') or {}
+        if not image or variants.get('source') == image.name:
+            continue
+        transaction.on_commit(
+            lambda field=field, name=image.name: get_executor().submit(
+                process_image_variants, model, instance.pk, field, name)
+        )
+
+
+class ResizedImageCache:
+    """
+    Diskdagi LRU kesh: fayllar kalit bo'yicha nomlanadi, o'qilganda mtime
+    yangilanadi va umumiy hajm ``max_bytes`` dan oshsa eng eskilari
+    o'chiriladi. Bir xil kalit uchun parallel so'rovlar bitta render'ni
+    kutadi (faqat shu jarayon ichida).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._size = None
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # yarim yozilgan fayl boshqa so'rovga ko'rinmasligi uchun
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+        return path
+
+    def get_or_render(self, key, render):
+        path = self.get(key)
+        if path is not None:
+            return path
+
+        with self._lock:
+            lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                # kutgan so'rovlar tayyor faylni oladi
+                path = self.get(key)
+                if path is None:
+                    path = self.put(key, render())
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return path
+
+    def open_or_render(self, key, render):
+        """
+        Kesh faylini ochib qaytaradi. Fayl ``get`` va ``open`` orasida
+        boshqa so'rovning eviction'i bilan o'chirilgan bo'lsa, qayta
+        render qilinadi va xotiradan beriladi.
+        """
+        path = self.get_or_render(key, render)
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            return BytesIO(render())
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self):
+        # 90% gacha tozalanadi: har bir yangi fayl uchun skanerlamaslik uchun
+        target = self.max_bytes * 0.9
+        size = 0
+        files = sorted(self._files(), reverse=True)
+        for mtime, file_size, path in files:
+            size += file_size
+            if size > target:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= file_size
+        self._size = size
+
+
+_resized_image_cache = None
+
+
+def get_resized_image_cache():
+    global _resized_image_cache
+    if _resized_image_cache is None:
+        _resized_image_cache = ResizedImageCache(
+            settings.IMAGE_RESIZE_CACHE_DIR,
+            settings.IMAGE_RESIZE_CACHE_MAX_BYTES
+        )
+    return _resized_image_cache
+
+
+def resized_image_key(name, width, fmt, storage=default_storage):
+    """
+    Kalitga asl faylning hajmi va o'zgarish vaqti kiradi: fayl almashsa
+    eski variant ishlatilmaydi. Kalit ETag sifatida ham ishlatiladi.
+    """
+    modified = storage.get_modified_time(name).timestamp()
+    return hashlib.sha256(
+        f"{name}|{storage.size(name)}|{modified}|{width}|{fmt}".encode()
+    ).hexdigest()
+
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from eateries.images import IMAGE_ERRORS, render_placeholder
+from eateries.models import Organization, ProductImage
+
+
+class Command(BaseCommand):
+    help = "Placeholder'i yo'q mahsulot rasmlari uchun o'lcham va placeholder hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.filter(
+            placeholder=''
+        ).exclude(image='').exclude(image__isnull=True)
+
+        batch, count = [], 0
+        for image in images.iterator(chunk_size=options['batch_size']):
+            try:
+                with image.image.open('rb') as file:
+                    image.width, image.height, image.placeholder = \
+                        render_placeholder(file)
+            except IMAGE_ERRORS as e:
+                self.stderr.write(f"{image.image.name}: {e}")
+                continue
+            image.updated_at = timezone.now()
+            batch.append(image)
+            if len(batch) >= options['batch_size']:
+                count += self.save(batch)
+                batch = []
+        count += self.save(batch)
+        self.stdout.write(f"{count} ta rasm yangilandi")
+
+    def save(self, images):
+        if not images:
+            return 0
+        ProductImage.objects.bulk_update(
+            images, ['width', 'height', 'placeholder', 'updated_at'])
+        # bulk_update signal yubormaydi
+        Organization.objects.filter(
+            products__images__in=images
+        ).bump_menu_version()
+        return len(images)
@@ -0,0 +1,157 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from eateries.models import (
+    Category,
+    Currency,
+    Order,
+    Organization,
+    Product,
+    Table,
+    UserProfile,
+    hash_token,
+)
+
+INDEXED_MODELS = (UserProfile, Organization, Product, Table, Order)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Sinov ma'lumotlarida asosiy so'rovlarning rejasi va vaqtini indekslarsiz "
+        "va indekslar bilan ko'rsatadi. Hamma o'zgarishlar oxirida bekor qilinadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizations', type=int, default=200)
+        parser.add_argument('--products', type=int, default=100)
+        parser.add_argument('--tables', type=int, default=30)
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                target = self.seed(options)
+                queries = self.hot_queries(target)
+                # SQLite'da schema_editor() konteksti tranzaksiya ichida
+                # ishlamaydi, indeks DDL uchun esa u kerak emas
+                schema_editor = connection.schema_editor()
+                for model in INDEXED_MODELS:
+                    for index in model._meta.indexes:
+                        schema_editor.remove_index(model, index)
+                self.report("Before (without indexes)", queries, options)
+
+                for model in INDEXED_MODELS:
+                    for index in model._meta.indexes:
+                        schema_editor.add_index(model, index)
+                self.report("After (with indexes)", queries, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        self.stdout.write("Seeding...")
+        currency = Currency.objects.create(name="So'm", code="UZS")
+        category_objs = Category.objects.bulk_create([
+            Category(name=f"Category {i}") for i in range(20)
+        ])
+        users = UserProfile.objects.bulk_create([
+            UserProfile(
+                phone_number=f"+998{i:09d}",
+                telegram_id=str(100000 + i),
+                auth_token=f"token-{i}",
+                auth_token_digest=hash_token(f"token-{i}"),
+            )
+            for i in range(options['organizations'])
+        ])
+        organizations = Organization.objects.bulk_create([
+            Organization(
+                user=user,
+                name=f"Organization {i}",
+                short_name=f"org{i}",
+                currency=currency,
+                phone_number="+998900000000",
+                address="Toshkent",
+                service_fee=Decimal("10.00"),
+            )
+            for i, user in enumerate(users)
+        ])
+        products, tables = [], []
+        for organization in organizations:
+            products += [
+                Product(
+                    organization=organization,
+                    category=category_objs[i % len(category_objs)],
+                    name=f"Product {i}",
+                    price=Decimal("1000.00"),
+                    is_active=i % 5 != 0,
+                )
+                for i in range(options['products'])
+            ]
+            tables += [
+                Table(organization=organization, number=str(i))
+                for i in range(1, options['tables'] + 1)
+            ]
+        Product.objects.bulk_create(products, batch_size=1000)
+        Table.objects.bulk_create(tables, batch_size=1000)
+
+        tables_by_organization = {}
+        for table in Table.objects.filter(number="1"):
+            tables_by_organization[table.organization_id] = table
+        orders = []
+        for organization, user in zip(organizations, users):
+            orders += [
+                Order(
+                    user=user,
+                    organization=organization,
+                    table=tables_by_organization[organization.id],
+                    status=("waiting", "ready", "delivered")[i % 3],
+                    total_price=Decimal("1000.00"),
+                )
+                for i in range(options['orders'])
+            ]
+        Order.objects.bulk_create(orders, batch_size=1000)
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        return organizations[len(organizations) // 2]
+
+    def hot_queries(self, organization):
+        user = organization.user
+        return {
+            "Organization by short_name": Organization.objects.filter(
+                short_name=organization.short_name),
+            "Active menu products": Product.objects.filter(
+                organization=organization, is_active=True
+            ).order_by("category__name"),
+            "Table by number": Table.objects.filter(
+                organization=organization, number="5"),
+            "Waiting orders": Order.objects.filter(
+                organization=organization, status="waiting"
+            ).order_by("-created_at"),
+            "Order list page": Order.objects.order_by(
+                "-created_at", "-id")[:50],
+            "User by telegram_id": UserProfile.objects.filter(
+                telegram_id=user.telegram_id),
+            "User by token digest": UserProfile.objects.filter(
+                auth_token_digest=user.auth_token_digest),
+        }
+
+    def report(self, title, queries, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{title}"))
+        for name, queryset in queries.items():
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / options['repeat']
+            self.stdout.write(self.style.SUCCESS(
+                f"\n{name}: {elapsed * 1000:.2f} ms"))
+            self.stdout.write(queryset.explain())
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from eateries.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Tokeni muddati o'tgan foydalanuvchilarni nofaol qiladi"
+
+    def handle(self, *args, **kwargs):
+        count = UserProfile.objects.deactivate_expired()
+        self.stdout.write(f"{count} ta foydalanuvchi nofaol qilindi")
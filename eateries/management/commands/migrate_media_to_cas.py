@@ -0,0 +1,163 @@
+import re
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import Case, Value, When
+
+from eateries.models import Organization, ProductOrder, TableBatchJob
+from eateries.storage import ContentAddressedStorage
+
+HASHED_NAME_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+# FileField emas, lekin storage yo'lini saqlaydigan maydonlar
+PATH_FIELDS = [
+    (ProductOrder, 'thumbnail'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "media/ dagi fayllarni kontent xeshi bo'yicha nomlangan fayllarga "
+        "ko'chiradi (dublikatlar bitta faylga birlashadi) va ImageField "
+        "yo'llarini bulk UPDATE bilan yangilaydi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument(
+            '--delete-originals', action='store_true',
+            help="Bazadagi yo'llar yangilangach eski fayllarni o'chiradi")
+
+    def handle(self, *args, **options):
+        self.storage = ContentAddressedStorage()
+        fields = self.file_fields()
+
+        names = set()
+        for model, field in fields:
+            names.update(
+                model.objects.exclude(**{field: ''}).exclude(
+                    **{f'{field}__isnull': True}
+                ).values_list(field, flat=True).distinct()
+            )
+            if hasattr(model, f'{field}_variants'):
+                for variants in model.objects.exclude(
+                    **{f'{field}_variants': {}}
+                ).values_list(f'{field}_variants', flat=True):
+                    names.update(self.variant_names(variants))
+        names.update(self.batch_job_names())
+
+        mapping = self.copy_files(names, options['dry_run'])
+        unique = len(set(mapping.values()))
+        self.stdout.write(
+            f"{len(mapping)} ta fayl -> {unique} ta noyob fayl")
+        if options['dry_run'] or not mapping:
+            return
+
+        with transaction.atomic():
+            for model, field in fields:
+                count = self.rewrite_field(
+                    model, field, mapping, options['batch_size'])
+                if hasattr(model, f'{field}_variants'):
+                    self.rewrite_variants(model, field, mapping)
+                self.stdout.write(f"{model.__name__}.{field}: {count} ta yozuv")
+            self.rewrite_batch_jobs(mapping)
+            # menyu snapshotlaridagi URL'lar eskirdi
+            Organization.objects.all().bump_menu_version()
+
+        if options['delete_originals']:
+            for name in mapping:
+                self.storage.delete(name)
+
+    @staticmethod
+    def file_fields():
+        return [
+            (model, field.name)
+            for model in apps.get_app_config('eateries').get_models()
+            for field in model._meta.get_fields()
+            if isinstance(field, models.FileField)
+        ] + PATH_FIELDS
+
+    @staticmethod
+    def variant_names(variants):
+        if variants.get('source'):
+            yield variants['source']
+        for formats in variants.get('sizes', {}).values():
+            yield from formats.values()
+
+    @staticmethod
+    def batch_job_names():
+        for result in TableBatchJob.objects.exclude(
+            result=[]
+        ).values_list('result', flat=True):
+            for table in result:
+                if table.get('qr_code'):
+                    yield table['qr_code']
+
+    def copy_files(self, names, dry_run):
+        mapping = {}
+        for name in sorted(names):
+            if HASHED_NAME_RE.match(name):
+                continue
+            if not self.storage.exists(name):
+                self.stderr.write(f"Topilmadi: {name}")
+                continue
+            if dry_run:
+                mapping[name] = name
+                continue
+            with self.storage.open(name) as file:
+                mapping[name] = self.storage.save(name, file)
+        return mapping
+
+    @staticmethod
+    def rewrite_field(model, field, mapping, batch_size):
+        """
+        Har bir partiya uchun bitta ``UPDATE ... SET field = CASE ...``.
+        """
+        old_names = list(mapping)
+        count = 0
+        for start in range(0, len(old_names), batch_size):
+            batch = old_names[start:start + batch_size]
+            count += model.objects.filter(**{f'{field}__in': batch}).update(**{
+                field: Case(
+                    *[When(**{field: old}, then=Value(mapping[old]))
+                      for old in batch],
+                    output_field=models.CharField(),
+                )
+            })
+        return count
+
+    def rewrite_variants(self, model, field, mapping):
+        variants_field = f'{field}_variants'
+        objs = []
+        for obj in model.objects.exclude(
+            **{variants_field: {}}
+        ).only('pk', variants_field):
+            variants = getattr(obj, variants_field)
+            setattr(obj, variants_field, {
+                **variants,
+                'source': mapping.get(
+                    variants.get('source'), variants.get('source')),
+                'sizes': {
+                    width: {
+                        fmt: mapping.get(name, name)
+                        for fmt, name in formats.items()
+                    }
+                    for width, formats in variants.get('sizes', {}).items()
+                },
+            })
+            objs.append(obj)
+        model.objects.bulk_update(objs, [variants_field], batch_size=500)
+
+    @staticmethod
+    def rewrite_batch_jobs(mapping):
+        jobs = []
+        for job in TableBatchJob.objects.exclude(result=[]).only('pk', 'result'):
+            job.result = [
+                {**table, 'qr_code': mapping.get(
+                    table.get('qr_code'), table.get('qr_code'))}
+                for table in job.result
+            ]
+            jobs.append(job)
+        TableBatchJob.objects.bulk_update(jobs, ['result'], batch_size=500)
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from eateries.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Muddati (IDEMPOTENCY_KEY_TTL) o'tgan Idempotency-Key yozuvlarini o'chiradi"
+
+    def handle(self, *args, **kwargs):
+        count, _ = IdempotencyKey.objects.filter(
+            created_at__lt=timezone.now() - timedelta(
+                seconds=settings.IDEMPOTENCY_KEY_TTL)
+        ).delete()
+        self.stdout.write(f"{count} ta kalit o'chirildi")
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class UserManager(models.Manager):
@@ -7,3 +8,27 @@ class UserManager(models.Manager):
 
     def get_customers(self):
         return self.filter(type='customer')
+
+    def deactivate_expired(self):
+        """
+        Tokeni muddati o'tgan barcha faol foydalanuvchilarni bitta UPDATE
+        bilan nofaol qiladi.
+        """
+        from .cache import evict_auth_user
+
+        expired = self.filter(is_active=True, token_expiry__lt=timezone.now())
+        user_ids = list(expired.values_list('id', flat=True))
+        if not user_ids:
+            return 0
+        # update() signal yubormaydi, keshni o'zimiz tozalaymiz
+        count = self.filter(id__in=user_ids).update(is_active=False)
+        evict_auth_user(*user_ids)
+        return count
+
+
+class OrganizationQuerySet(models.QuerySet):
+    def bump_menu_version(self):
+        """
+        Menyu snapshotlarini eskirgan deb belgilash uchun versiyani oshiradi.
+        """
+        return self.update(menu_version=models.F('menu_version') + 1)
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 07:59
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0024_alter_organization_phone_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='menu_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Menu version'),
+        ),
+        migrations.CreateModel(
+            name='MenuSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('base_url', models.CharField(max_length=255, verbose_name='Base URL')),
+                ('version', models.PositiveIntegerField(verbose_name='Version')),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Data')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_snapshots', to='eateries.organization', verbose_name='Organization')),
+            ],
+            options={
+                'verbose_name': 'Menu snapshot',
+                'verbose_name_plural': 'Menu snapshots',
+                'unique_together': {('organization', 'base_url')},
+            },
+        ),
+    ]
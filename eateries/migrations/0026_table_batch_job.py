@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 08:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0025_menu_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableBatchJob',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('table_count', models.PositiveIntegerField(verbose_name='Table count')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='Status')),
+                ('result', models.JSONField(blank=True, default=list, verbose_name='Result')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='table_batch_jobs', to='eateries.organization', verbose_name='Organization')),
+            ],
+            options={
+                'verbose_name': 'Table batch job',
+                'verbose_name_plural': 'Table batch jobs',
+            },
+        ),
+    ]
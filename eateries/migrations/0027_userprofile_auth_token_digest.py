@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 08:06
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_auth_token_digest(apps, schema_editor):
+    UserProfile = apps.get_model('eateries', 'UserProfile')
+    users = list(UserProfile.objects.exclude(auth_token__isnull=True).exclude(
+        auth_token='').only('id', 'auth_token'))
+    for user in users:
+        user.auth_token_digest = hashlib.sha256(
+            user.auth_token.encode()).hexdigest()
+    UserProfile.objects.bulk_update(
+        users, ['auth_token_digest'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0026_table_batch_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='auth_token_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='Auth Token digest'),
+        ),
+        migrations.RunPython(
+            fill_auth_token_digest, migrations.RunPython.noop),
+    ]
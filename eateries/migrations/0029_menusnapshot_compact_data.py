@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-18 08:10
+
+import django.core.serializers.json
+from django.db import migrations, models
+from django.db.models import F
+
+
+def bump_menu_versions(apps, schema_editor):
+    # mavjud snapshotlarda compact_data bo'sh: ular qayta qurilishi kerak
+    Organization = apps.get_model('eateries', 'Organization')
+    Organization.objects.update(menu_version=F('menu_version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0028_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menusnapshot',
+            name='compact_data',
+            field=models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Compact data'),
+        ),
+        migrations.RunPython(bump_menu_versions, migrations.RunPython.noop),
+    ]
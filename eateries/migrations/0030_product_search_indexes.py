@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Faqat PostgreSQL: SQLite'da mahsulotlar xotiradagi indeks bilan qidiriladi
+# (eateries/search.py).
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS product_search_vector_idx "
+    "ON eateries_product USING gin (to_tsvector('simple'::regconfig, "
+    "COALESCE(name, '') || ' ' || COALESCE(description, '')))",
+    "CREATE INDEX IF NOT EXISTS product_name_trgm_idx "
+    "ON eateries_product USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS wifi_name_trgm_idx "
+    "ON eateries_wifi USING gin (name gin_trgm_ops)",
+]
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+    "DROP INDEX IF EXISTS product_name_trgm_idx",
+    "DROP INDEX IF EXISTS wifi_name_trgm_idx",
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0029_menusnapshot_compact_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(FORWARD_SQL),
+            run_on_postgresql(BACKWARD_SQL),
+        ),
+    ]
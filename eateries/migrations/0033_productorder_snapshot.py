@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-18 08:23
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_snapshot(apps, schema_editor):
+    ProductOrder = apps.get_model('eateries', 'ProductOrder')
+    ProductImage = apps.get_model('eateries', 'ProductImage')
+    first_image = ProductImage.objects.filter(
+        product=OuterRef('product_id')
+    ).order_by('id').values('image')[:1]
+    lines = ProductOrder.objects.select_related(
+        'product__category'
+    ).annotate(first_image=Subquery(first_image))
+
+    batch = []
+    for line in lines.iterator(chunk_size=1000):
+        line.product_name = line.product.name
+        line.unit_price = line.product.price
+        line.category_name = line.product.category.name
+        line.thumbnail = line.first_image or line.product.image.name or ''
+        batch.append(line)
+        if len(batch) >= 1000:
+            ProductOrder.objects.bulk_update(batch, [
+                'product_name', 'unit_price', 'category_name', 'thumbnail'])
+            batch = []
+    ProductOrder.objects.bulk_update(batch, [
+        'product_name', 'unit_price', 'category_name', 'thumbnail'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0032_productimage_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productorder',
+            name='category_name',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Category name'),
+        ),
+        migrations.AddField(
+            model_name='productorder',
+            name='product_name',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Product name'),
+        ),
+        migrations.AddField(
+            model_name='productorder',
+            name='thumbnail',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Thumbnail'),
+        ),
+        migrations.AddField(
+            model_name='productorder',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Unit price'),
+        ),
+        # eski qatorlar: hozirgi mahsulot ma'lumotlaridan
+        migrations.RunPython(fill_snapshot, migrations.RunPython.noop),
+    ]
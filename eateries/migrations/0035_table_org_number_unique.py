@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 08:34
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tables(apps, schema_editor):
+    # bir xil raqamli stollar: eng eskisi qoladi, buyurtmalar unga o'tkaziladi
+    Table = apps.get_model('eateries', 'Table')
+    Order = apps.get_model('eateries', 'Order')
+    duplicates = Table.objects.values('organization', 'number').annotate(
+        keep_id=Min('id'), count=Count('id')
+    ).filter(count__gt=1)
+    for row in duplicates:
+        tables = Table.objects.filter(
+            organization=row['organization'], number=row['number']
+        ).exclude(id=row['keep_id'])
+        Order.objects.filter(table__in=tables).update(table_id=row['keep_id'])
+        tables.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0034_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tables, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='table',
+            name='table_org_number_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='table',
+            constraint=models.UniqueConstraint(fields=('organization', 'number'), name='table_org_number_uniq'),
+        ),
+    ]
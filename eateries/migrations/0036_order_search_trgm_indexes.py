@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Faqat PostgreSQL: buyurtmalar ro'yxatidagi ?search= (icontains) JOIN
+# orqali ``UPPER(col::text) LIKE UPPER('%...%')`` ga aylanadi, trigram
+# indeks shu ifoda bo'yicha quriladi.
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS organization_short_name_trgm_idx "
+    "ON eateries_organization USING gin (UPPER(short_name::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS table_number_trgm_idx "
+    "ON eateries_table USING gin (UPPER(number::text) gin_trgm_ops)",
+]
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS organization_short_name_trgm_idx",
+    "DROP INDEX IF EXISTS table_number_trgm_idx",
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0035_table_org_number_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(FORWARD_SQL),
+            run_on_postgresql(BACKWARD_SQL),
+        ),
+    ]
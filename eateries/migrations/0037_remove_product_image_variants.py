@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 08:48
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eateries', '0036_order_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='product',
+            name='image_variants',
+        ),
+    ]
@@ -1,10 +1,19 @@
+import hashlib
+import uuid
+
 from django.utils import timezone
 from datetime import timedelta, datetime
 from django.contrib.auth.hashers import make_password, check_password
 from django.db import models
 from django.core.validators import RegexValidator
 
-from .managers import UserManager
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .managers import UserManager, OrganizationQuerySet
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 class BaseModel(models.Model):
@@ -75,6 +84,14 @@ class UserProfile(BaseModel):
         blank=True,
         null=True
     )
+    auth_token_digest = models.CharField(
+        max_length=64,
+        verbose_name='Auth Token digest',
+        unique=True,
+        editable=False,
+        blank=True,
+        null=True
+    )
     token_expiry = models.DateTimeField(
         verbose_name="Token Expiry",
         blank=True,
@@ -95,6 +112,16 @@ class UserProfile(BaseModel):
     def check_password(self, raw_password):
         return check_password(raw_password, self.password)
 
+    def save(self, *args, **kwargs):
+        # token qidiruvi indekslangan, qat'iy uzunlikdagi digest bo'yicha
+        self.auth_token_digest = (
+            hash_token(self.auth_token) if self.auth_token else None
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'auth_token' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'auth_token_digest'}
+        super().save(*args, **kwargs)
+
     # def __str__(self) -> str:
     #     return " | ".join([self.id, self.phone_number])
 
@@ -104,6 +131,13 @@ class UserProfile(BaseModel):
         verbose_name = 'User profile'
         verbose_name_plural = 'User profiles'
         ordering = ['-created_at']
+        indexes = [
+            # bot har bir xabarda telegram_id bo'yicha qidiradi
+            models.Index(
+                fields=['telegram_id'],
+                name='userprofile_telegram_id_idx'
+            ),
+        ]
 
 
 class Currency(BaseModel):
@@ -172,6 +206,12 @@ class Organization(BaseModel):
         blank=True,
         null=True
     )
+    logo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Logo variants'
+    )
     short_name = models.CharField(
         max_length=50,
         verbose_name='Short name'
@@ -202,6 +242,12 @@ class Organization(BaseModel):
         blank=True,
         null=True
     )
+    wallpaper_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Wallpaper variants'
+    )
     service_fee = models.DecimalField(
         max_digits=5,
         decimal_places=2,
@@ -224,6 +270,28 @@ class Organization(BaseModel):
         blank=True,
         null=True
     )
+    menu_version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Menu version'
+    )
+
+    objects = OrganizationQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # menu_version faqat bump_menu_version() orqali yoziladi: eski
+        # in-memory qiymat parallel F() bump'ni bosib ketmasligi uchun
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                ]
+            kwargs['update_fields'] = [
+                name for name in update_fields if name != 'menu_version'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         return " | ".join([self.short_name, self.phone_number])
@@ -231,6 +299,13 @@ class Organization(BaseModel):
     class Meta:
         verbose_name = 'Organization'
         verbose_name_plural = 'Organizations'
+        indexes = [
+            # QR skanerlash: data/<short_name>
+            models.Index(
+                fields=['short_name'],
+                name='organization_short_name_idx'
+            ),
+        ]
 
 
 class Category(BaseModel):
@@ -244,6 +319,12 @@ class Category(BaseModel):
         blank=True,
         null=True
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Image variants'
+    )
 
     def __str__(self) -> str:
         return self.name
@@ -303,6 +384,14 @@ class Product(BaseModel):
     class Meta:
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
+        indexes = [
+            # menyu: faol mahsulotlar, kategoriya bo'yicha
+            models.Index(
+                fields=['organization', 'category'],
+                condition=models.Q(is_active=True),
+                name='product_active_org_cat_idx'
+            ),
+        ]
 
 
 class Table(BaseModel):
@@ -329,6 +418,14 @@ class Table(BaseModel):
     class Meta:
         verbose_name = 'Table'
         verbose_name_plural = 'Tables'
+        constraints = [
+            # parallel batch job'lar bir xil raqamli stol yaratmasligi uchun;
+            # data/<short_name>?t=<number> qidiruvi ham shu indeksdan foydalanadi
+            models.UniqueConstraint(
+                fields=['organization', 'number'],
+                name='table_org_number_uniq'
+            ),
+        ]
 
 
 class ProductOrder(BaseModel):
@@ -347,9 +444,36 @@ class ProductOrder(BaseModel):
     quantity = models.PositiveIntegerField(
         verbose_name='Quantity'
     )
+    # buyurtma paytidagi holat: menyu o'zgarsa ham chek o'zgarmaydi va
+    # o'qishda mahsulot jadvaliga JOIN kerak emas
+    product_name = models.CharField(
+        max_length=255,
+        verbose_name='Product name',
+        blank=True,
+        default=''
+    )
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Unit price',
+        blank=True,
+        null=True
+    )
+    category_name = models.CharField(
+        max_length=255,
+        verbose_name='Category name',
+        blank=True,
+        default=''
+    )
+    thumbnail = models.CharField(
+        max_length=255,
+        verbose_name='Thumbnail',
+        blank=True,
+        default=''
+    )
 
     def __str__(self) -> str:
-        return " | ".join([self.product.name, str(self.quantity)])
+        return " | ".join([self.product_name, str(self.quantity)])
 
     class Meta:
         unique_together = ('order', 'product')
@@ -413,6 +537,18 @@ class Order(BaseModel):
     class Meta:
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
+        indexes = [
+            # oshxona: ?organization=X&status=waiting, yangilari birinchi
+            models.Index(
+                fields=['organization', 'status', '-created_at'],
+                name='order_org_status_created_idx'
+            ),
+            # cursor pagination: (-created_at, -id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='order_created_id_idx'
+            ),
+        ]
 
 
 class ProductImage(BaseModel):
@@ -428,7 +564,148 @@ class ProductImage(BaseModel):
         blank=True,
         null=True
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Image variants'
+    )
+    # menyu rasm yuklanmasdan oldin joylashuvni chizishi uchun
+    width = models.PositiveIntegerField(
+        verbose_name='Width',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    height = models.PositiveIntegerField(
+        verbose_name='Height',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    placeholder = models.TextField(
+        verbose_name='Placeholder',
+        blank=True,
+        default='',
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Image'
         verbose_name_plural = 'Images'
+
+
+class MenuSnapshot(BaseModel):
+    organization = models.ForeignKey(
+        to=Organization,
+        on_delete=models.CASCADE,
+        verbose_name='Organization',
+        related_name='menu_snapshots'
+    )
+    base_url = models.CharField(
+        max_length=255,
+        verbose_name='Base URL'
+    )
+    version = models.PositiveIntegerField(
+        verbose_name='Version'
+    )
+    data = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        verbose_name='Data'
+    )
+    compact_data = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        default=dict,
+        verbose_name='Compact data'
+    )
+
+    class Meta:
+        unique_together = ('organization', 'base_url')
+        verbose_name = 'Menu snapshot'
+        verbose_name_plural = 'Menu snapshots'
+
+
+class TableBatchJob(BaseModel):
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    organization = models.ForeignKey(
+        to=Organization,
+        on_delete=models.CASCADE,
+        verbose_name='Organization',
+        related_name='table_batch_jobs'
+    )
+    table_count = models.PositiveIntegerField(
+        verbose_name='Table count'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default='pending',
+        verbose_name='Status'
+    )
+    result = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Result'
+    )
+    error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Error'
+    )
+
+    class Meta:
+        verbose_name = 'Table batch job'
+        verbose_name_plural = 'Table batch jobs'
+
+
+class IdempotencyKey(BaseModel):
+    """
+    ``Idempotency-Key`` sarlavhasi bilan kelgan so'rovning birinchi javobi.
+    Takroriy so'rovlarga shu javob qaytariladi; parallel dublikatlarni
+    unique constraint to'xtatadi.
+    """
+    user = models.ForeignKey(
+        to=UserProfile,
+        on_delete=models.CASCADE,
+        verbose_name='User',
+        related_name='idempotency_keys'
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name='Key'
+    )
+    request_hash = models.CharField(
+        max_length=64,
+        verbose_name='Request hash'
+    )
+    status_code = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Status code'
+    )
+    response = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        blank=True,
+        null=True,
+        verbose_name='Response'
+    )
+
+    class Meta:
+        verbose_name = 'Idempotency key'
+        verbose_name_plural = 'Idempotency keys'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                name='idempotency_key_user_key_uniq'
+            ),
+        ]
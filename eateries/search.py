@@ -0,0 +1,167 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Organization, Product
+
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return re.findall(r'\w+', (text or '').casefold())
+
+
+class ProductSearchIndex:
+    """
+    Bitta tashkilot mahsulotlari uchun xotiradagi inverted index.
+
+    ``version`` — indeks qurilgan paytdagi ``Organization.menu_version``;
+    boshqa jarayondagi o'zgarishlar versiya orqali seziladi.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self._sorted_tokens = None
+
+    def add(self, product_id, name, description):
+        self.remove(product_id)
+        weights = defaultdict(int)
+        for token in tokenize(name):
+            weights[token] += NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+        for token, weight in weights.items():
+            self.postings[token][product_id] = weight
+        self.documents[product_id] = set(weights)
+        self._sorted_tokens = None
+
+    def remove(self, product_id):
+        for token in self.documents.pop(product_id, ()):
+            self.postings[token].pop(product_id, None)
+            if not self.postings[token]:
+                del self.postings[token]
+        self._sorted_tokens = None
+
+    def _matching_tokens(self, term, prefix):
+        if not prefix:
+            return [term] if term in self.postings else []
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        tokens = []
+        position = bisect_left(self._sorted_tokens, term)
+        while (position < len(self._sorted_tokens)
+               and self._sorted_tokens[position].startswith(term)):
+            tokens.append(self._sorted_tokens[position])
+            position += 1
+        return tokens
+
+    def search(self, text, prefix=False):
+        """
+        Barcha so'zlar mos kelgan mahsulotlarni ``{product_id: ball}``
+        ko'rinishida qaytaradi. ``prefix`` rejimida so'zlar boshlanishi
+        bo'yicha qidiriladi (autocomplete).
+        """
+        scores = None
+        for term in tokenize(text):
+            term_scores = defaultdict(int)
+            for token in self._matching_tokens(term, prefix):
+                for product_id, weight in self.postings[token].items():
+                    # to'liq mos kelish prefiksdan yuqori turadi
+                    term_scores[product_id] += weight * (
+                        2 if token == term else 1)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    product_id: score + term_scores[product_id]
+                    for product_id, score in scores.items()
+                    if product_id in term_scores
+                }
+        return dict(scores or {})
+
+
+class ProductSearchIndexRegistry:
+    """
+    Jarayon ichidagi indekslar: tashkilot bo'yicha kerak bo'lganda quriladi,
+    shu jarayondagi o'zgarishlar bilan qisman yangilanadi va menyu versiyasi
+    o'zgarganda (boshqa jarayon yozgan bo'lsa) qaytadan quriladi.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def _current_version(self, organization_id):
+        return Organization.objects.filter(
+            pk=organization_id
+        ).values_list('menu_version', flat=True).first()
+
+    def _get(self, organization_id):
+        version = self._current_version(organization_id)
+        with self._lock:
+            index = self._indexes.get(organization_id)
+        if index is not None and index.version == version:
+            return index
+
+        index = ProductSearchIndex(version)
+        products = Product.objects.filter(
+            organization_id=organization_id
+        ).values_list('id', 'name', 'description')
+        for product_id, name, description in products.iterator():
+            index.add(product_id, name, description)
+        with self._lock:
+            self._indexes[organization_id] = index
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def search(self, organization_id, text, prefix=False):
+        index = self._get(organization_id)
+        with self._lock:
+            return index.search(text, prefix=prefix)
+
+    def update(self, product, deleted=False):
+        """
+        Shu jarayonda qurilgan indeksni qayta qurmasdan, tranzaksiya commit
+        bo'lgach yangilaydi. Menyu versiyasi oshirilgandan keyin chaqiriladi.
+
+        Indeks faqat aynan oldingi versiyada bo'lsa yangilanadi: oraliqda
+        boshqa jarayon yozgan o'zgarishlar bu yerda ko'rinmaydi, shuning
+        uchun bunday indeks tashlab yuboriladi va keyingi qidiruvda
+        qaytadan quriladi.
+        """
+        organization_id = product.organization_id
+        with self._lock:
+            if organization_id not in self._indexes:
+                return
+        # bump qilingan qator commitgacha qulflangan: versiya shu o'zgarishniki
+        version = self._current_version(organization_id)
+        product_id = product.id
+        name, description = product.name, product.description
+
+        def apply():
+            with self._lock:
+                index = self._indexes.get(organization_id)
+                if index is None or index.version >= version:
+                    return
+                if index.version != version - 1:
+                    del self._indexes[organization_id]
+                    return
+                if deleted:
+                    index.remove(product_id)
+                else:
+                    index.add(product_id, name, description)
+                index.version = version
+
+        transaction.on_commit(apply)
+
+
+product_search_indexes = ProductSearchIndexRegistry()
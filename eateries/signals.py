@@ -0,0 +1,97 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import evict_auth_user
+from .events import publish_order_event_on_commit
+from .images import schedule_image_variants, set_placeholder
+from .search import product_search_indexes
+from .models import (
+    Category,
+    Currency,
+    Order,
+    Organization,
+    Product,
+    ProductImage,
+    UserProfile,
+    WiFi,
+)
+
+
+# < ========= Authenticated user cache ========= >
+@receiver([post_save, post_delete], sender=UserProfile)
+def user_profile_changed(sender, instance, **kwargs):
+    # bot jarayonidagi tasdiqlash/bekor qilish ham shu yerdan o'tadi
+    evict_auth_user(instance.pk)
+
+
+# < ========= Menu version ========= >
+@receiver([post_save, post_delete], sender=Organization)
+def organization_changed(sender, instance, **kwargs):
+    Organization.objects.filter(pk=instance.pk).bump_menu_version()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, signal, **kwargs):
+    Organization.objects.filter(
+        pk=instance.organization_id
+    ).bump_menu_version()
+    # versiya oshirilgandan keyin: indeks yangi versiyani oladi
+    product_search_indexes.update(instance, deleted=signal is post_delete)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    Organization.objects.filter(
+        products__id=instance.product_id
+    ).bump_menu_version()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    Organization.objects.filter(
+        products__category_id=instance.pk
+    ).bump_menu_version()
+
+
+@receiver([post_save, post_delete], sender=WiFi)
+def wifi_changed(sender, instance, **kwargs):
+    if instance.organization_id is None:
+        return
+    Organization.objects.filter(
+        pk=instance.organization_id
+    ).bump_menu_version()
+
+
+@receiver([post_save, post_delete], sender=Currency)
+def currency_changed(sender, instance, **kwargs):
+    Organization.objects.filter(
+        currency_id=instance.pk
+    ).bump_menu_version()
+
+
+# < ========= Image variants ========= >
+@receiver(pre_save, sender=ProductImage)
+def product_image_uploaded(sender, instance, **kwargs):
+    # fayl hali storage'ga yozilmagan: yangi yuklangan rasm
+    if instance.image and not instance.image._committed:
+        set_placeholder(instance)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=ProductImage)
+def image_saved(sender, instance, **kwargs):
+    schedule_image_variants(instance)
+
+
+# < ========= Order events ========= >
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    publish_order_event_on_commit(
+        instance, "order.created" if created else "order.updated"
+    )
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    publish_order_event_on_commit(instance, "order.deleted")
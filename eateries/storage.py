@@ -0,0 +1,44 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+def content_hash(content):
+    sha256 = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha256.hexdigest()
+
+
+def hashed_name(name, digest):
+    _, ext = os.path.splitext(name)
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Fayllarni kontentining SHA-256 xeshi bo'yicha nomlaydi:
+    ``ab/cd/abcd...ef.jpg`` (``upload_to`` papkasi e'tiborga olinmaydi).
+
+    Bir xil fayl qayta yuklansa, diskka yozilmaydi va mavjud nom qaytadi.
+    Nomlar o'zgarmas bo'lgani uchun ``serve_media`` ularni immutable
+    sifatida keshlaydi. Bitta fayl bir nechta yozuvga tegishli bo'lishi
+    mumkin, shuning uchun ``delete()`` faqat havolasi qolmagan fayllar
+    uchun chaqirilishi kerak.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = hashed_name(name, content_hash(content))
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -1,3 +1,152 @@
-from django.shortcuts import render
+import mimetypes
+import os
+import re
+from urllib.parse import quote
 
-# Create your views here.
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+# nomida kontent xeshi bor fayllar hech qachon o'zgarmaydi
+HASHED_NAME_RE = re.compile(r'(^|[/_.-])[0-9a-f]{16,}([/_.-]|$)')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def media_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Bitta ``bytes=start-end`` oralig'ini ``(start, end)`` ko'rinishida
+    qaytaradi. Bir nechta oraliq yoki noto'g'ri sarlavha uchun ``None``
+    (to'liq fayl yuboriladi), bajarib bo'lmaydigan oraliq uchun ``False``.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # bytes=-500: oxirgi 500 bayt
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def file_range_iterator(path, start, length, chunk_size):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_media(request, path):
+    """
+    ``MEDIA_ROOT`` dagi faylni qismlab uzatadi: ``Range``, ``ETag`` va
+    ``If-None-Match`` qo'llab-quvvatlanadi. ``MEDIA_SENDFILE_HEADER``
+    berilgan bo'lsa, faylni front server (nginx/Apache) yuboradi.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = media_etag(stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_media_response(
+            request, path, full_path, stat, etag, last_modified)
+
+    if response.status_code not in (200, 206, 304):
+        return response
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if HASHED_NAME_RE.search(path):
+        patch_cache_control(
+            response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def build_media_response(request, path, full_path, stat, etag, last_modified):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    sendfile_header = settings.MEDIA_SENDFILE_HEADER
+    if sendfile_header:
+        # Range va uzatishni front server bajaradi
+        response = HttpResponse(content_type=content_type)
+        if sendfile_header == 'X-Accel-Redirect':
+            response[sendfile_header] = (
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path))
+        else:
+            response[sendfile_header] = full_path
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if 'Range' in request.headers and if_range_matches(
+            request, etag, last_modified):
+        byte_range = parse_range(request.headers['Range'], size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        # WSGI server wsgi.file_wrapper (sendfile) orqali yuborishi mumkin
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type)
+        response.block_size = settings.MEDIA_CHUNK_SIZE
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            file_range_iterator(
+                full_path, start, end - start + 1, settings.MEDIA_CHUNK_SIZE),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response